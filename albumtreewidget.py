@@ -4,8 +4,17 @@ from PyQt6.QtCore import Qt
 from collections import defaultdict
 import sqlite3
 import os
-from fuzzywuzzy import fuzz
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from loadingbar import LoadingBar
+from embeddedlyrics import extract_embedded_lyrics
+from lyricstimeline import LyricsTimeline
+from startuptrace import startup_tracer
+
+
+# the columns shown in the song table, in its column order
+SONG_COLUMNS = "title, artist, album, year, genre, track_number, duration, file_path, file_type"
 
 
 def extract_track_number(track_number):
@@ -35,6 +44,9 @@ class AlbumTreeWidget(QWidget):
         self.config_path = self.parent.config_path
         self.conn = None
         self.cursor = None
+        # embedded lyrics are read from the tags after the scan, so the window does not wait for them
+        self.lyrics_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedded-lyrics")
+        self.stop_extracting = threading.Event()
         self.search_bar = QLineEdit()
         self.initUI()
 
@@ -101,6 +113,8 @@ class AlbumTreeWidget(QWidget):
         matched_albums = []  # List to store matched and visible albums
         matched_artists = []  # List to store matched and visible artists
 
+        from fuzzywuzzy import fuzz  # only needed once someone searches
+
         def matches_search(text):
             # Simplify the matching function by checking directly for fuzzy match if needed
             return search_text in text.lower() or (search_text and fuzz.partial_ratio(search_text, text.lower()) > 80)
@@ -181,14 +195,25 @@ class AlbumTreeWidget(QWidget):
                 track_number TEXT,
                 duration INTEGER,
                 file_path TEXT PRIMARY KEY,
-                file_type TEXT
+                file_type TEXT,
+                lyrics_source TEXT,
+                embedded_lyrics BLOB
             )
         ''')
 
+        # databases from before lyrics were indexed
+        self.cursor.execute('PRAGMA table_info(songs)')
+        columns = [column[1] for column in self.cursor.fetchall()]
+        if 'lyrics_source' not in columns:
+            self.cursor.execute('ALTER TABLE songs ADD COLUMN lyrics_source TEXT')
+        if 'embedded_lyrics' not in columns:
+            self.cursor.execute('ALTER TABLE songs ADD COLUMN embedded_lyrics BLOB')
+
         self.conn.commit()
 
     def loadSongsToCollection(self, directories=None, loadAgain=False):
-        self.initialize_database()
+        with startup_tracer.phase("db open"):
+            self.initialize_database()
 
         if loadAgain:
             self.tree_widget.clear()
@@ -201,14 +226,24 @@ class AlbumTreeWidget(QWidget):
         self.parent.media_files.clear()  # clean the remaining files first
 
         media_extensions = {'.mp3', '.ogg', '.wav', '.flac', '.aac', '.m4a'}
-
-        for directory, value in directories.items():
-            if value:
-                # Recursively find all media files
-                for root, _, files in os.walk(directory):
-                    for file in files:
-                        if os.path.splitext(file)[1].lower() in media_extensions:
-                            self.parent.media_files.append(os.path.join(root, file))
+        sidecar_lyrics = {}  # (directory, lowercase stem) -> lrc path
+
+        with startup_tracer.phase("directory walk"):
+            for directory, value in directories.items():
+                if value:
+                    # Recursively find all media files, and the lrc files next to them
+                    for root, _, files in os.walk(directory):
+                        for file in files:
+                            stem, extension = os.path.splitext(file)
+                            extension = extension.lower()
+                            if extension in media_extensions:
+                                self.parent.media_files.append(os.path.join(root, file))
+                            elif extension == '.lrc':
+                                sidecar_lyrics[(root, stem.lower())] = os.path.join(root, file)
+
+        folder_lyrics = self.index_lyrics_folder(self.parent.ej.get_value("lyrics_directory"))
+        changed_lyrics_sources = []
+        missing_embedded_lyrics = []
 
         songs_by_artist = defaultdict(list)
 
@@ -229,7 +264,8 @@ class AlbumTreeWidget(QWidget):
         # Check if the database already has the songs stored
         for index, item_path in enumerate(self.parent.media_files):
             loadingBar.update_loadingbar(index + 1)
-            self.cursor.execute('SELECT * FROM songs WHERE file_path=?', (item_path,))
+            self.cursor.execute(f'SELECT {SONG_COLUMNS}, lyrics_source, length(embedded_lyrics) FROM songs '
+                                f'WHERE file_path=?', (item_path,))
             result = self.cursor.fetchone()
 
             def format_duration(seconds):
@@ -249,14 +285,28 @@ class AlbumTreeWidget(QWidget):
                     'duration': result[6],
                     'file_type': result[8]
                 }
+
+                # NULL until the embedded lyrics have been extracted, an empty blob means none
+                embedded_length = result[10]
+                if embedded_length is None:
+                    missing_embedded_lyrics.append(item_path)
+
+                lyrics_source = self.find_lyrics_source(item_path, metadata, sidecar_lyrics, folder_lyrics)
+                if lyrics_source is None and embedded_length:
+                    lyrics_source = item_path
+                if lyrics_source != result[9]:
+                    changed_lyrics_sources.append((lyrics_source, item_path))
             else:
                 # Otherwise, extract the metadata and store it in the database
                 self.parent.music_file = item_path
                 metadata = self.parent.get_metadata(item_path)
+                lyrics_source = self.find_lyrics_source(item_path, metadata, sidecar_lyrics, folder_lyrics)
+                missing_embedded_lyrics.append(item_path)
 
                 self.cursor.execute('''
-                    INSERT INTO songs (title, artist, album, year, genre, track_number, duration, file_path, file_type)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO songs (title, artist, album, year, genre, track_number, duration, file_path, file_type,
+                        lyrics_source)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     metadata['title'],
                     metadata['artist'],
@@ -266,7 +316,8 @@ class AlbumTreeWidget(QWidget):
                     metadata['track_number'],
                     format_duration(metadata['duration']),
                     item_path,
-                    metadata['file_type']
+                    metadata['file_type'],
+                    lyrics_source
                 ))
                 self.conn.commit()
 
@@ -275,9 +326,97 @@ class AlbumTreeWidget(QWidget):
             track_number = metadata['track_number']
             songs_by_artist[artist].append((album, track_number, item_path, metadata))
 
-        self.loadSongsToAlbumTree(songs_by_artist)
+        if changed_lyrics_sources:
+            self.cursor.executemany('UPDATE songs SET lyrics_source=? WHERE file_path=?', changed_lyrics_sources)
+        self.conn.commit()
+
+        if missing_embedded_lyrics:
+            self.lyrics_executor.submit(self.extract_missing_embedded_lyrics, missing_embedded_lyrics)
+
+        with startup_tracer.phase("tree build"):
+            self.loadSongsToAlbumTree(songs_by_artist)
         loadingBar.close()
 
+    @staticmethod
+    def index_lyrics_folder(lyrics_directory):
+        # lrc files collected in one folder, found by the song's file name or by "artist - title"
+        folder_lyrics = {}
+        if lyrics_directory and os.path.isdir(lyrics_directory):
+            for root, _, files in os.walk(lyrics_directory):
+                for file in files:
+                    stem, extension = os.path.splitext(file)
+                    if extension.lower() == '.lrc':
+                        folder_lyrics[stem.lower()] = os.path.join(root, file)
+        return folder_lyrics
+
+    @staticmethod
+    def find_lyrics_source(item_path, metadata, sidecar_lyrics, folder_lyrics):
+        directory, file = os.path.split(item_path)
+        stem = os.path.splitext(file)[0].lower()
+
+        lyrics_source = sidecar_lyrics.get((directory, stem)) or folder_lyrics.get(stem)
+        if lyrics_source is None and metadata['artist'] and metadata['title']:
+            lyrics_source = folder_lyrics.get(f"{metadata['artist']} - {metadata['title']}".lower())
+        return lyrics_source
+
+    @staticmethod
+    def extract_embedded_lyrics_blob(item_path):
+        # compressed serialized timeline, so playing the song needs neither the tags nor the parser
+        timeline = extract_embedded_lyrics(item_path)
+        if timeline is None:
+            return b''
+        return zlib.compress(timeline.to_bytes())
+
+    def extract_missing_embedded_lyrics(self, file_paths, batch_size=100):
+        # on the executor's thread with its own connection, written in batches so that an exit keeps what is done
+        db_path = os.path.join(self.config_path, "databases", "songs.db")
+        for start in range(0, len(file_paths), batch_size):
+            extracted = []
+            for file_path in file_paths[start:start + batch_size]:
+                if self.stop_extracting.is_set():
+                    break
+                extracted.append((self.extract_embedded_lyrics_blob(file_path), file_path))
+
+            try:
+                with sqlite3.connect(db_path) as conn:
+                    conn.executemany('UPDATE songs SET embedded_lyrics=? WHERE file_path=?', extracted)
+                    # songs without an lrc file are their own lyrics source
+                    conn.executemany('UPDATE songs SET lyrics_source=file_path '
+                                     'WHERE file_path=? AND lyrics_source IS NULL AND length(embedded_lyrics) > 0',
+                                     [(file_path,) for _, file_path in extracted])
+            except sqlite3.Error as e:
+                print(f"Database error: {e}")
+                return
+
+            if self.stop_extracting.is_set():
+                return
+        print(f"Extracted the embedded lyrics of {len(file_paths)} songs")
+
+    def stop_extracting_lyrics(self):
+        self.stop_extracting.set()
+        self.lyrics_executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_embedded_lyrics(self, file_path):
+        """The timeline of a song's embedded lyrics. Opens its own connection, so it can run on the lyrics threads."""
+        try:
+            with sqlite3.connect(os.path.join(self.config_path, "databases", "songs.db")) as conn:
+                row = conn.execute('SELECT embedded_lyrics FROM songs WHERE file_path=?', (file_path,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return None
+
+        if not row or not row[0]:
+            return None
+        return LyricsTimeline.from_bytes(zlib.decompress(row[0]))
+
+    def get_lyrics_source(self, file_path):
+        """The lrc file found for a song during the last scan, None if it has none."""
+        if not self.cursor:
+            return None
+        self.cursor.execute('SELECT lyrics_source FROM songs WHERE file_path=?', (file_path,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
     def loadSongsToAlbumTree(self, songs_by_artist):
         self.tree_widget.clear()  # Clear existing items
 
@@ -322,7 +461,7 @@ class AlbumTreeWidget(QWidget):
         self.parent.prepare_for_random()
 
     def add_song_by_file_path(self, file_path):
-        self.cursor.execute('SELECT * FROM songs WHERE file_path=?', (file_path,))
+        self.cursor.execute(f'SELECT {SONG_COLUMNS} FROM songs WHERE file_path=?', (file_path,))
         song = self.cursor.fetchone()
         if song:
 
@@ -331,6 +470,8 @@ class AlbumTreeWidget(QWidget):
             # Check if the file_path is already in the playlist
             if file_path not in self.songTableWidget.files_on_playlist:
                 self.songTableWidget.files_on_playlist.append(file_path)
+                self.parent.session_journal.queue_add(file_path)
+                self.parent.music_player.invalidate_preload()
                 self.songTableWidget.insertRow(self.songTableWidget.rowCount())
 
                 for i, data in enumerate(song):
@@ -360,7 +501,7 @@ class AlbumTreeWidget(QWidget):
         if not self.cursor:
             return
 
-        self.cursor.execute('SELECT * FROM songs WHERE album=?', (album,))
+        self.cursor.execute(f'SELECT {SONG_COLUMNS} FROM songs WHERE album=?', (album,))
         songs = self.cursor.fetchall()
 
         sorted_songs_data = sorted(songs, key=lambda x: extract_track_number(x[5]))  # Sort by track_number
@@ -374,15 +515,17 @@ class AlbumTreeWidget(QWidget):
             self.songTableWidget.scroll_to_and_highlight_multiple_rows(existing_song_rows)
 
         else:
+            self.parent.session_journal.queue_album_title(sorted_songs_data[0][7])
             self.add_album_title_row(album)
             for song in sorted_songs_data:
                 self.add_song_row(song)
+            self.parent.music_player.invalidate_preload()
 
     def add_songs_by_artist(self, artist):
         if not self.cursor:
             return
 
-        self.cursor.execute('SELECT * FROM songs WHERE artist=?', (artist,))
+        self.cursor.execute(f'SELECT {SONG_COLUMNS} FROM songs WHERE artist=?', (artist,))
         songs = self.cursor.fetchall()
 
         sorted_albums = defaultdict(list)
@@ -402,10 +545,13 @@ class AlbumTreeWidget(QWidget):
                 self.songTableWidget.scroll_to_and_highlight_multiple_rows(existing_song_rows)
 
             else:
+                self.parent.session_journal.queue_album_title(sorted_songs_data[0][7])
                 self.add_album_title_row(album)
                 for song in sorted_songs_data:
                     self.add_song_row(song)
 
+        self.parent.music_player.invalidate_preload()
+
     def add_song_row(self, song):
         # Insert song data into the QTableWidget
         row_position = self.songTableWidget.rowCount()
@@ -421,6 +567,7 @@ class AlbumTreeWidget(QWidget):
         file_path = song[7]  # Assuming file_path is at index 7
         if file_path not in self.songTableWidget.files_on_playlist:
             self.songTableWidget.files_on_playlist.append(file_path)
+            self.parent.session_journal.queue_add(file_path)
 
     def find_row_by_exact_match(self, search_text: str):  # just to search in col 7 exact file path
         """
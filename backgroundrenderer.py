@@ -0,0 +1,125 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QImage
+
+"""
+Renders the lrc display's background image for a screen: scaled to the screen's height, centered on black,
+with the "April Music Player" watermark in the bottom right corner.
+
+Every variant is stored in its own file, named after a hash of the source file (path, size, mtime),
+the target size in device pixels and the device pixel ratio, so a new background or another screen
+never reuses a wrong image. Slideshow slides are only rendered in memory: a folder goes round and round,
+and writing every slide would push the single backgrounds out of the KEPT_VARIANTS on disk.
+Rendering and decoding happen on a worker thread, the gui only receives a finished QImage to turn into a pixmap.
+"""
+
+RENDER_VERSION = 1  # bump when the rendering changes, old variants are then ignored
+KEPT_VARIANTS = 8
+
+
+class BackgroundRenderer(QObject):
+    # key and QImage of a requested variant, delivered on the gui thread
+    rendered = pyqtSignal(str, object)
+
+    def __init__(self, cache_dir, watermark_font_path):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.watermark_font_path = watermark_font_path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="background")
+        self.pending = set()  # keys being rendered
+
+    @staticmethod
+    def variant_key(source, width, height, device_pixel_ratio):
+        try:
+            stat = os.stat(source)
+            source_id = f"{source}|{stat.st_size}|{stat.st_mtime_ns}"
+        except OSError:
+            source_id = source
+        description = f"{RENDER_VERSION}|{source_id}|{width}x{height}@{device_pixel_ratio}"
+        return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+    def variant_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def request(self, source, width, height, device_pixel_ratio, persist=True):
+        """Returns the key of the variant right away, rendered(key, image) follows from the worker."""
+        key = self.variant_key(source, width, height, device_pixel_ratio)
+        if key not in self.pending:
+            self.pending.add(key)
+            self.executor.submit(self.load, key, source, width, height, device_pixel_ratio, persist)
+        return key
+
+    def load(self, key, source, width, height, device_pixel_ratio, persist=True):
+        path = self.variant_path(key)
+        try:
+            if os.path.exists(path):
+                os.utime(path)  # recently used, keep it when pruning
+                image = QImage(path)
+            elif persist:
+                self.render(path, source, width, height)
+                image = QImage(path)
+            else:
+                image = self.render_in_memory(source, width, height)
+
+            if image.isNull():
+                raise OSError(f"cannot read {path}")
+            image.setDevicePixelRatio(device_pixel_ratio)
+        except Exception as e:
+            print(f"Error rendering background image {source}: {e}")
+            return
+        finally:
+            self.pending.discard(key)
+
+        self.rendered.emit(key, image)
+
+    def render(self, path, source, width, height):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        final_image = self.render_image(source, width, height)
+
+        # written under a temporary name first, so that no one ever reads half a file
+        temporary_path = f"{path}.tmp"
+        final_image.save(temporary_path, format="PNG")
+        os.replace(temporary_path, path)
+        self.prune()
+
+    def render_in_memory(self, source, width, height):
+        final_image = self.render_image(source, width, height)
+        data = final_image.tobytes()
+        # copied, so the QImage owns its pixels once data goes away
+        return QImage(data, width, height, width * 3, QImage.Format.Format_RGB888).copy()
+
+    def render_image(self, source, width, height):
+        from PIL import Image, ImageDraw, ImageFont  # imported by the worker thread the first time it renders
+
+        image = Image.open(source)
+        image.draft("RGB", (width, height))  # jpeg files decode at a reduced size when that is enough
+        image = image.convert("RGB")
+
+        # Calculate the new dimensions to maintain the aspect ratio
+        new_width = int(height * image.width / image.height)
+        resized_image = image.resize((new_width, height), Image.LANCZOS)
+
+        final_image = Image.new("RGB", (width, height), "black")
+        final_image.paste(resized_image, ((width - new_width) // 2, 0))
+
+        # the watermark, with an outline that PIL strokes in a single pass
+        draw = ImageDraw.Draw(final_image)
+        font = ImageFont.truetype(self.watermark_font_path, max(int(height * 0.05), 1))
+        text = "April Music Player"
+        stroke_width = max(height // 500, 2)
+        bbox = draw.textbbox((0, 0), text, font=font, stroke_width=stroke_width)
+        text_position = (width - (bbox[2] - bbox[0]) - 10, height - (bbox[3] - bbox[1]) - 10)
+        draw.text(text_position, text, font=font, fill="white", stroke_width=stroke_width, stroke_fill="black")
+        return final_image
+
+    def prune(self):
+        # only the most recently rendered variants are kept
+        variants = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".png")]
+        variants.sort(key=os.path.getmtime, reverse=True)
+        for old_variant in variants[KEPT_VARIANTS:]:
+            try:
+                os.remove(old_variant)
+            except OSError:
+                pass
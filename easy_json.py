@@ -1,88 +1,167 @@
-import json
-import os
-import platform
-
-"""The class is still not functioning wrong but I will keep the update implement."""
-
-
-class EasyJson:
-    def __init__(self):
-        if platform.system() == "Windows":
-            self.config_path = os.path.join(os.getenv('APPDATA'), 'April Music Player')
-        else:
-            self.config_path = os.path.join(os.path.expanduser("~"), '.config', 'april-music-player')
-
-        config_file = os.path.join(self.config_path, "configs", "config.json")
-        self.config_file = config_file
-        self.script_path = os.path.dirname(os.path.abspath(__file__))
-
-        # Load the JSON data once at initialization
-        self.data = self._load_json()
-
-    def setupBackgroundImage(self):
-        self.edit_value("background_image", os.path.join(self.script_path, "background-images", "default.jpg"))
-
-    def setupLyricsColor(self):
-        self.edit_value("lyrics_color", "white")
-
-    def _load_json(self):
-        """Load the JSON file and return the data as a dictionary."""
-        if not os.path.exists(self.config_file):
-            return {}  # Return an empty dictionary if the file doesn't exist
-
-        try:
-            with open(self.config_file, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            print(f"Error: Unable to read or decode {self.config_file}. Returning empty config.")
-            return {}
-
-    def _save_json(self):
-        """Save the current data to the JSON file."""
-        try:
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            with open(self.config_file, "w") as f:
-                json.dump(self.data, f, indent=4)
-        except IOError as e:
-            print(f"Error: Failed to write to file {self.config_file}. {e}")
-        self._load_json()
-
-    def get_value(self, key):
-        """Retrieve the value of a key from the JSON data."""
-        return self.data.get(key, None)
-
-    def edit_value(self, key, value):
-        """Edit the value of a key in the JSON data."""
-        self.data[key] = value
-        self._save_json()
-
-    def setup_default_values(self, lrc_font_size=60, fresh_config=False):
-        default_values = {
-            "english_font": os.path.join(self.script_path, "fonts/PositiveForward.otf"),
-            "korean_font": os.path.join(self.script_path, "fonts/NotoSerifKR-ExtraBold.ttf"),
-            "japanese_font": os.path.join(self.script_path, "fonts/NotoSansJP-Bold.otf"),
-            "chinese_font": os.path.join(self.script_path, "fonts/NotoSerifKR-ExtraBold.ttf"),
-            "lrc_font_size": lrc_font_size,
-            "sync_threshold": 0.3,
-            "early_sync_time": 0.2,
-            "lyrics_color": "white",
-            "show_lyrics": True,
-            "play_song_at_startup": False,
-            "shuffle": False,
-            "repeat": False,
-            "loop": False,
-            "previous_loop": False,
-            "previous_shuffle": False,
-            "music_directories": {},
-            "last_played_song": {}
-        }
-
-        if fresh_config:
-            self.data = default_values  # Replace with default values
-            self._save_json()
-        else:
-            # Add any missing default values
-            for key, default_value in default_values.items():
-                if key not in self.data:
-                    self.data[key] = default_value
-            self._save_json()
+import atexit
+import copy
+import json
+import os
+import platform
+import threading
+
+"""
+The player's configuration, one store for the whole process.
+
+Every EasyJson() is the same object, so a value edited in one window is seen everywhere at once.
+The data in memory is the source of truth: edit_value only changes it and schedules a write,
+and edits that come close together are written once, FLUSH_DELAY seconds after the last one.
+Writes go to a temporary file that then replaces config.json, so a crash never leaves half a file,
+and whatever is still pending is written when the process exits.
+"""
+
+FLUSH_DELAY = 0.5  # seconds
+
+
+class EasyJson:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._initialized = False
+            return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return  # the shared store is already loaded
+        self._initialized = True
+
+        if platform.system() == "Windows":
+            self.config_path = os.path.join(os.getenv('APPDATA'), 'April Music Player')
+        else:
+            self.config_path = os.path.join(os.path.expanduser("~"), '.config', 'april-music-player')
+
+        config_file = os.path.join(self.config_path, "configs", "config.json")
+        self.config_file = config_file
+        self.script_path = os.path.dirname(os.path.abspath(__file__))
+
+        self.lock = threading.RLock()
+        self.flush_timer = None
+        self.listeners = {}  # key -> callbacks(key, value) run after the value changes
+
+        # Load the JSON data once for the whole process
+        self.data = self._load_json()
+        atexit.register(self.flush)
+
+    def setupBackgroundImage(self):
+        self.edit_value("background_image", os.path.join(self.script_path, "background-images", "default.jpg"))
+
+    def setupLyricsColor(self):
+        self.edit_value("lyrics_color", "white")
+
+    def _load_json(self):
+        """Load the JSON file and return the data as a dictionary."""
+        if not os.path.exists(self.config_file):
+            return {}  # Return an empty dictionary if the file doesn't exist
+
+        try:
+            with open(self.config_file, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            print(f"Error: Unable to read or decode {self.config_file}. Returning empty config.")
+            return {}
+
+    def _save_json(self):
+        """Write the current data to the JSON file right away, through a temporary file."""
+        with self.lock:
+            try:
+                # values handed out by get_value can still be changed in place by the gui thread meanwhile
+                data = copy.deepcopy(self.data)
+            except RuntimeError as e:
+                print(f"Config changed while saving it, trying again. {e}")
+                self.schedule_save()
+                return
+
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+
+            temporary_file = f"{self.config_file}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
+                with open(temporary_file, "w") as f:
+                    json.dump(data, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporary_file, self.config_file)
+            except (IOError, TypeError, ValueError) as e:
+                print(f"Error: Failed to write to file {self.config_file}. {e}")
+
+    def schedule_save(self):
+        # restarts the countdown, a burst of edits is written once
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+            self.flush_timer = threading.Timer(FLUSH_DELAY, self.flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def flush(self):
+        """Write pending edits now, e.g. before exiting."""
+        with self.lock:
+            if self.flush_timer is not None:
+                self._save_json()
+
+    def get_value(self, key):
+        """Retrieve the value of a key from the JSON data."""
+        return self.data.get(key, None)
+
+    def edit_value(self, key, value):
+        """Edit the value of a key, config.json is written shortly after."""
+        with self.lock:
+            self.data[key] = copy.deepcopy(value)  # not shared with the caller, who may keep changing it
+            self.schedule_save()
+
+        for callback in list(self.listeners.get(key, ())):
+            callback(key, value)
+
+    def subscribe(self, key, callback):
+        """Call callback(key, value) whenever key is edited."""
+        self.listeners.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, key, callback):
+        if callback in self.listeners.get(key, ()):
+            self.listeners[key].remove(callback)
+
+    def setup_default_values(self, lrc_font_size=60, fresh_config=False):
+        default_values = {
+            "english_font": os.path.join(self.script_path, "fonts/PositiveForward.otf"),
+            "korean_font": os.path.join(self.script_path, "fonts/NotoSerifKR-ExtraBold.ttf"),
+            "japanese_font": os.path.join(self.script_path, "fonts/NotoSansJP-Bold.otf"),
+            "chinese_font": os.path.join(self.script_path, "fonts/NotoSerifKR-ExtraBold.ttf"),
+            "lrc_font_size": lrc_font_size,
+            "early_sync_time": 0.2,
+            "lyrics_color": "white",
+            "show_lyrics": True,
+            "play_song_at_startup": False,
+            "shuffle": False,
+            "repeat": False,
+            "loop": False,
+            "previous_loop": False,
+            "previous_shuffle": False,
+            "music_directories": {},
+            "last_played_song": {},
+            "readahead_tracks": 2,
+            "readahead_budget_mb": 256,
+            "lyrics_directory": "",
+            "background_folder": "",
+            "background_interval": 30
+        }
+
+        if fresh_config:
+            self.data = default_values  # Replace with default values
+            self._save_json()
+        else:
+            # Add any missing default values
+            for key, default_value in default_values.items():
+                if key not in self.data:
+                    self.data[key] = default_value
+            self._save_json()
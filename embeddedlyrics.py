@@ -0,0 +1,91 @@
+from lrcparser import parse_lrc_text
+from lyricstimeline import LyricsTimeline
+
+"""
+Lyrics stored in the tags of the audio file itself:
+    mp3          SYLT (synced, converted to lrc lines) or USLT
+    ogg / flac   LYRICS or UNSYNCEDLYRICS vorbis comments
+    m4a          \xa9lyr
+Lyrics with timestamps give a timeline to scroll along with, plain unsynced text becomes a single untimed line
+holding all of it, shown as static text for the whole song.
+"""
+
+SYLT_MILLISECONDS = 2  # SYLT time stamp format, 1 would be mpeg frames
+
+
+def format_lrc_time(milliseconds):
+    minutes, milliseconds = divmod(int(milliseconds), 60000)
+    return f"{minutes:02d}:{milliseconds / 1000:05.2f}"
+
+
+def sylt_to_lrc(frame):
+    """
+    SYLT syllables as enhanced lrc, one [mm:ss.xx] line per lyric line with a <mm:ss.xx> timing per syllable.
+
+    A line break in a syllable starts a new line, which begins at the next syllable with text.
+    Frames without any line break are written one line per entry, taggers that do so store whole lines.
+    """
+    entries = [(text.replace("\r\n", "\n").replace("\r", "\n"), milliseconds) for text, milliseconds in frame.text]
+    if not any("\n" in text for text, _ in entries):
+        return "\n".join(f"[{format_lrc_time(milliseconds)}]{text.strip()}"
+                         for text, milliseconds in entries if text.strip())
+
+    lines = []  # [start milliseconds, syllables with their timings]
+    new_line = True
+    for text, milliseconds in entries:
+        for index, syllable in enumerate(text.split("\n")):
+            if index:
+                new_line = True
+            if not syllable.strip():
+                continue
+            if new_line:
+                lines.append((milliseconds, []))
+                syllable = syllable.lstrip()
+                new_line = False
+            lines[-1][1].append(f"<{format_lrc_time(milliseconds)}>{syllable}")
+
+    return "\n".join(f"[{format_lrc_time(start)}]{''.join(syllables).rstrip()}" for start, syllables in lines)
+
+
+def read_id3_lyrics(tags):
+    for frame in tags.getall("SYLT"):
+        if frame.format == SYLT_MILLISECONDS and frame.text:
+            return sylt_to_lrc(frame)
+
+    for frame in tags.getall("USLT"):
+        if frame.text:
+            return frame.text
+    return None
+
+
+def read_tag_lyrics(tags):
+    for key in ("\xa9lyr", "lyrics", "unsyncedlyrics"):
+        value = tags.get(key)
+        if value:
+            return str(value[0])
+    return None
+
+
+def extract_embedded_lyrics(path):
+    """The embedded lyrics of an audio file as a LyricsTimeline, None if it has none."""
+    try:
+        from mutagen import File  # imported on first use, it is not needed to start up
+        audio = File(path)
+        if audio is None or audio.tags is None:
+            return None
+
+        # mp3 and wav files carry id3 frames, the others key/value tags
+        if hasattr(audio.tags, "getall"):
+            text = read_id3_lyrics(audio.tags)
+        else:
+            text = read_tag_lyrics(audio.tags)
+    except Exception as e:
+        print(f"Could not read embedded lyrics of {path}: {e}")
+        return None
+
+    if not text or not text.strip():
+        return None
+    timeline = parse_lrc_text(text)
+    if not timeline:
+        timeline = LyricsTimeline([0.0], [text.strip()])  # unsynced
+    return timeline
@@ -0,0 +1,157 @@
+import bisect
+import json
+import os
+import re
+from array import array
+
+"""
+Which of the configured fonts draws which character.
+
+Built once from the cmap (the character to glyph table) of each font, as sorted codepoint ranges,
+and saved next to the config so that later starts only read a small json file.
+A character belongs to the font of its own script when that font has a glyph for it,
+otherwise to the first font in LANGUAGE_ORDER that has one.
+"""
+
+LANGUAGE_ORDER = ("english", "korean", "japanese", "chinese")
+
+# codepoint ranges of the scripts that have their own font, everything else is "english"
+SCRIPT_RANGES = (
+    (0x1100, 0x11FF, "korean"),  # hangul jamo
+    (0x3040, 0x30FF, "japanese"),  # hiragana and katakana
+    (0x3130, 0x318F, "korean"),  # hangul compatibility jamo
+    (0x31F0, 0x31FF, "japanese"),  # katakana phonetic extensions
+    (0x3400, 0x4DBF, "chinese"),  # cjk extension a
+    (0x4E00, 0x9FFF, "chinese"),  # cjk unified ideographs
+    (0xAC00, 0xD7A3, "korean"),  # hangul syllables
+    (0xF900, 0xFAFF, "chinese"),  # cjk compatibility ideographs
+    (0xFF66, 0xFF9F, "japanese"),  # halfwidth katakana
+    (0x20000, 0x2FFFF, "chinese"),  # cjk extensions b and later
+)
+SCRIPT_STARTS = [start for start, _, _ in SCRIPT_RANGES]
+
+# ideographs are shared by chinese and japanese, next to kana they are japanese
+KANA = re.compile("[\u3040-\u30ff\u31f0-\u31ff\uff66-\uff9f]")
+
+COVERAGE_VERSION = 1
+
+
+def script_of(code):
+    index = bisect.bisect_right(SCRIPT_STARTS, code) - 1
+    if index >= 0 and code <= SCRIPT_RANGES[index][1]:
+        return SCRIPT_RANGES[index][2]
+    return "english"
+
+
+def font_file_key(path):
+    try:
+        stat = os.stat(path)
+        return [path, stat.st_size, stat.st_mtime_ns]
+    except (OSError, TypeError):
+        return [path, 0, 0]
+
+
+class FontCoverage:
+    def __init__(self, starts, languages):
+        self.starts = array('I', starts)  # first codepoint of each range, sorted
+        self.languages = languages  # language of each range, None where no font has a glyph
+
+    def lookup(self, code):
+        """The language of the range containing code, and the codepoint where that range ends."""
+        index = bisect.bisect_right(self.starts, code) - 1
+        end = self.starts[index + 1] if index + 1 < len(self.starts) else 0x110000
+        if index < 0:
+            return None, end
+        return self.languages[index], end
+
+    def runs(self, text):
+        """Split text into (language, run) pairs, with one range search per run rather than per character."""
+        japanese_text = KANA.search(text) is not None
+        runs = []
+        run_language = None
+        run_start = 0
+        range_start, range_end = 1, 0  # empty, the first character always looks its range up
+        language = None
+
+        for index, char in enumerate(text):
+            code = ord(char)
+            if not range_start <= code < range_end:
+                language, range_end = self.lookup(code)
+                range_start = code
+                language = language or "english"
+                if language == "chinese" and japanese_text:
+                    language = "japanese"
+
+            if language != run_language:
+                if run_language is not None:
+                    runs.append((run_language, text[run_start:index]))
+                run_language = language
+                run_start = index
+
+        if run_language is not None:
+            runs.append((run_language, text[run_start:]))
+        return runs
+
+    @classmethod
+    def build(cls, font_paths):
+        """font_paths maps each language to its font file."""
+        from fontTools.ttLib import TTFont  # only needed when the cache file is out of date
+
+        cmaps = {}
+        for language in LANGUAGE_ORDER:
+            path = font_paths.get(language)
+            try:
+                # only the cmap table is read, lazy loading skips the glyphs
+                font = TTFont(path, lazy=True, fontNumber=0)
+                cmaps[language] = set(font.getBestCmap() or {})
+                font.close()
+            except Exception as e:
+                print(f"Could not read the character map of {path}: {e}")
+                cmaps[language] = set()
+
+        starts = []
+        languages = []
+        previous_code = None
+        for code in sorted(set().union(*cmaps.values())):
+            home = script_of(code)
+            if code in cmaps[home]:
+                language = home
+            else:
+                language = next(language for language in LANGUAGE_ORDER if code in cmaps[language])
+
+            if previous_code is None or code != previous_code + 1:
+                # characters that none of the fonts have
+                starts.append(0 if previous_code is None else previous_code + 1)
+                languages.append(None)
+            if language != languages[-1]:
+                starts.append(code)
+                languages.append(language)
+            previous_code = code
+
+        if previous_code is not None:
+            starts.append(previous_code + 1)
+            languages.append(None)
+
+        return cls(starts, languages)
+
+    @classmethod
+    def load(cls, font_paths, cache_file):
+        """The coverage of the given fonts, from the cache file if the fonts have not changed since it was written."""
+        key = [COVERAGE_VERSION] + [font_file_key(font_paths.get(language)) for language in LANGUAGE_ORDER]
+
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if cached["key"] == key:
+                return cls(cached["starts"], cached["languages"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        coverage = cls.build(font_paths)
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file, "w") as f:
+                json.dump({"key": key, "starts": list(coverage.starts), "languages": coverage.languages}, f)
+        except OSError as e:
+            print(f"Could not save the font coverage: {e}")
+        return coverage
@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+from PyQt6.QtGui import QFontDatabase, QFont, QTextCharFormat
+from easy_json import EasyJson
+from fontcoverage import FontCoverage
+
+"""
+Process wide registry of the font files the player uses.
+
+Every font file is added to the QFontDatabase once, its family name is read with fontTools only the first time
+it is ever seen (then kept in configs/font_names.json with the file's size and mtime),
+and QFont / QTextCharFormat objects are shared between everyone asking for the same font and size.
+"""
+
+
+def read_font_name(font_path):
+    from fontTools.ttLib import TTFont  # only needed for fonts not in font_names.json yet
+
+    font = TTFont(font_path, lazy=True, fontNumber=0)
+    try:
+        for record in font['name'].names:
+            if record.nameID == 4:  # Full font name
+                return record.toStr()
+    finally:
+        font.close()
+    return None
+
+
+class FontRegistry:
+    def __init__(self):
+        self.ej = EasyJson()
+        self.names_file = os.path.join(self.ej.config_path, "configs", "font_names.json")
+        self.names = None  # path -> [size, mtime_ns, font name], loaded on first use
+        self.registered = {}  # path -> application font id from QFontDatabase
+        self.fonts = {}  # (font name, size) -> QFont
+        self.formats = {}  # (font name, size) -> QTextCharFormat
+        self.coverages = {}  # font files -> FontCoverage
+        self.lock = threading.Lock()
+
+    def load_names(self):
+        try:
+            with open(self.names_file, "r") as f:
+                self.names = json.load(f)
+        except (OSError, ValueError):
+            self.names = {}
+
+    def save_names(self):
+        try:
+            os.makedirs(os.path.dirname(self.names_file), exist_ok=True)
+            with open(self.names_file, "w") as f:
+                json.dump(self.names, f, indent=4)
+        except OSError as e:
+            print(f"Error: Failed to write to file {self.names_file}. {e}")
+
+    def font_name(self, font_path):
+        """The full name of the font in a font file, None if it cannot be read."""
+        if not font_path:
+            return None
+
+        with self.lock:
+            if self.names is None:
+                self.load_names()
+
+            try:
+                stat = os.stat(font_path)
+            except OSError as e:
+                print(f"Error loading font {font_path}: {e}")
+                return None
+
+            cached = self.names.get(font_path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                return cached[2]
+
+            try:
+                font_name = read_font_name(font_path)
+            except Exception as e:
+                print(f"Error loading font {font_path}: {e}")
+                return None
+
+            self.names[font_path] = [stat.st_size, stat.st_mtime_ns, font_name]
+            self.save_names()
+            return font_name
+
+    def register(self, font_path):
+        """Add a font file to the application's font database, only the first time it is asked for."""
+        if font_path and font_path not in self.registered:
+            self.registered[font_path] = QFontDatabase.addApplicationFont(font_path)
+            if self.registered[font_path] == -1:
+                print(f"Error loading font {font_path}")
+        return self.registered.get(font_path, -1)
+
+    def font(self, font_name, font_size):
+        key = (font_name, font_size)
+        if key not in self.fonts:
+            self.fonts[key] = QFont(font_name, font_size)
+        return self.fonts[key]
+
+    def text_format(self, font_name, font_size):
+        key = (font_name, font_size)
+        if key not in self.formats:
+            text_format = QTextCharFormat()
+            text_format.setFont(self.font(font_name, font_size))
+            self.formats[key] = text_format
+        return self.formats[key]
+
+    def coverage(self, font_paths):
+        """Which of the given fonts draws which character, see FontCoverage."""
+        key = tuple(sorted(font_paths.items()))
+        if key not in self.coverages:
+            cache_file = os.path.join(self.ej.config_path, "configs", "font_coverage.json")
+            self.coverages[key] = FontCoverage.load(font_paths, cache_file)
+        return self.coverages[key]
+
+
+font_registry = FontRegistry()
@@ -4,7 +4,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QFontDatabase, QIcon, QKeyEvent
 from easy_json import EasyJson
-from fontTools.ttLib import TTFont
+from fontregistry import font_registry
 from PyQt6.QtCore import Qt
 
 
@@ -20,15 +20,8 @@ def create_language_layout(language_label, font_label, example_label, change_but
 
 
 def get_font_name_from_file(font_path):
-    try:
-        font = TTFont(font_path)
-        name_records = font['name'].names
-        for record in name_records:
-            if record.nameID == 4:  # Name ID 4 usually contains the full font name
-                return record.toStr()
-    except Exception:
-        pass
-    return "Unknown Font"  # Default if nameID 4 is not found or there is an error
+    # read once and then remembered by the registry
+    return font_registry.font_name(font_path) or "Unknown Font"  # Default if nameID 4 is not found or there is an error
 
 
 class FontSettingsWindow(QDialog):
@@ -161,6 +154,7 @@ class FontSettingsWindow(QDialog):
             self, "Open Font File", "", "Font Files (*.ttf *.otf)"
         )
         if font_file:
+            font_registry.register(font_file)  # so that the example label can use it right away
             self.fonts[language] = get_font_name_from_file(font_file)
             self.update_font_display(language)
 
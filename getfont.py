@@ -1,9 +1,8 @@
-from PyQt6.QtGui import QFontDatabase, QFont, QTextDocument, QTextCursor, QTextCharFormat
-from fontTools.ttLib import TTFont
 from easy_json import EasyJson
+from fontregistry import font_registry
+from collections import OrderedDict
+from html import escape
 import os
-import string
-from PyQt6.QtGui import QFont, QFontDatabase, QTextCharFormat, QTextDocument, QTextCursor
 
 """
 preformatted fonts for different languages
@@ -15,14 +14,11 @@ apply format, return html text
 """
 
 
-def create_text_format(font_name, font_size):
-    font = QFont(font_name, font_size)
-    text_format = QTextCharFormat()
-    text_format.setFont(font)
-    return text_format
-
-
 class GetFont:
+    FORMATTED_CACHE_SIZE = 1024
+    # (text, fonts) -> html, shared by all instances since the same lines are formatted for several labels
+    formatted_cache = OrderedDict()
+
     def __init__(self, font_size=14):
         self.language_dict = None
         self.script_path = os.path.dirname(os.path.abspath(__file__))
@@ -31,13 +27,9 @@ class GetFont:
         self.load_font_settings()  # Initialize the font settings
         self.fonts_loaded = False
         self.formats = {}
-
-        self.LANGUAGE_RANGES = {
-            "english": (0x0041, 0x007A),  # A-Z, a-z
-            "korean": (0xAC00, 0xD7A3),
-            "japanese": [(0x3040, 0x309F), (0x30A0, 0x30FF), (0x4E00, 0x9FFF)],
-            "chinese": (0x4e00, 0x9fff)
-        }
+        self.span_starts = {}  # language -> opening span tag with its font
+        self.fonts_key = None  # identifies the fonts and size in the formatted cache
+        self.coverage = None  # which font draws which characters
 
     def load_font_settings(self):
         english_font = self.ej.get_value("english_font")
@@ -56,29 +48,24 @@ class GetFont:
         }
 
     def loadFonts(self):
-        loaded_fonts = set()
         for lang, font_info in self.language_dict.items():
-            if font_info["file_path"] and font_info["file_path"] not in loaded_fonts:
-                try:
-                    QFontDatabase.addApplicationFont(font_info["file_path"])
-                    loaded_fonts.add(font_info["file_path"])
-                except Exception as e:
-                    print(f"Error loading font {font_info['font_name']}: {e}")
-            self.formats[lang] = create_text_format(font_info["font_name"], font_info["size"])
+            # the registry adds each file to the font database only once for all instances
+            font_registry.register(font_info["file_path"])
+            self.formats[lang] = font_registry.text_format(font_info["font_name"], font_info["size"])
+            self.span_starts[lang] = (f"<span style=\" font-family:'{escape(str(font_info['font_name']))}';"
+                                      f" font-size:{font_info['size']}pt;\">")
+        self.fonts_key = tuple(sorted(self.span_starts.items()))
+        self.coverage = self.load_coverage()
         self.fonts_loaded = True
 
+    def load_coverage(self):
+        return font_registry.coverage({lang: font_info["file_path"] for lang, font_info in self.language_dict.items()})
+
     def detect_language(self, char):
-        code = ord(char)
-        if self.LANGUAGE_RANGES["english"][0] <= code <= self.LANGUAGE_RANGES["english"][1]:
-            return "english"
-        elif self.LANGUAGE_RANGES["korean"][0] <= code <= self.LANGUAGE_RANGES["korean"][1]:
-            return "korean"
-        elif self.LANGUAGE_RANGES["chinese"][0] <= code <= self.LANGUAGE_RANGES["chinese"][1]:
-            return "chinese"
-        for range_set in self.LANGUAGE_RANGES["japanese"]:
-            if isinstance(range_set, tuple) and range_set[0] <= code <= range_set[1]:
-                return "japanese"
-        return None
+        if not self.fonts_loaded:
+            self.loadFonts()
+        language, _ = self.coverage.lookup(ord(char))
+        return language
 
     # def apply_fonts_to_text(self, text):  # new method, still needs fixes
     #     if not self.fonts_loaded:
@@ -116,15 +103,40 @@ class GetFont:
         if not self.fonts_loaded:
             self.loadFonts()
 
-        doc = QTextDocument()
-        cursor = QTextCursor(doc)
-
-        for char in text:
-            language = self.detect_language(char) or "english"
-            cursor.setCharFormat(self.formats.get(language, self.formats["english"]))
-            cursor.insertText(char)
-
-        return doc.toHtml()
+        key = (text, self.fonts_key)
+        cache = GetFont.formatted_cache
+        html = cache.get(key)
+        if html is not None:
+            cache.move_to_end(key)
+            return html
+
+        html = self.format_runs(text)
+        cache[key] = html
+        if len(cache) > self.FORMATTED_CACHE_SIZE:
+            cache.popitem(last=False)
+        return html
+
+    def format_runs(self, text):
+        # one span per run of characters in the same language instead of one per character
+        parts = ['<p style=" margin:0px; white-space:pre-wrap;">']
+        for language, run in self.coverage.runs(text):
+            parts.append(self.format_run(language, run))
+        parts.append("</p>")
+        return "".join(parts)
+
+    def format_run(self, language, run):
+        span_start = self.span_starts.get(language, self.span_starts["english"])
+        return f"{span_start}{escape(run, quote=False).replace(chr(10), '<br/>')}</span>"
+
+    def font_runs(self, text):
+        """The text split into (QFont, run) pairs, for painting it directly."""
+        if not self.fonts_loaded:
+            self.loadFonts()
+        runs = []
+        for language, run in self.coverage.runs(str(text)):
+            font_info = self.language_dict.get(language, self.language_dict["english"])
+            runs.append((font_registry.font(font_info["font_name"], font_info["size"]), run))
+        return runs
 
     def get_formatted_text(self, text):
         return self.apply_fonts_to_text(text)
@@ -137,10 +149,4 @@ class GetFont:
 
     @staticmethod
     def get_font_name(font_path):
-        font = TTFont(font_path)
-        name_records = font['name'].names
-        for record in name_records:
-            if record.nameID == 4:  # Full font name
-                font_name = record.toStr()
-                return font_name
-        return None
+        return font_registry.font_name(font_path)
@@ -0,0 +1,201 @@
+import codecs
+import os
+import sys
+import time
+from lyricstimeline import LyricsTimeline
+
+"""
+Parser for .lrc files, straight into a LyricsTimeline.
+
+Handles every variant found in the wild in one pass over the lines, without a regex per line:
+    [01:02.34]text                    simple lines, with 2 or 3 fraction digits, or none, or ':' instead of '.'
+    [01:02.34][02:10.00]text          one text repeated at several timestamps
+    [ar:Artist] [ti:Title] [offset:+250] ...   ID tags, kept in the timeline's metadata
+    [01:02.34]<01:02.34>word <01:02.80>word    enhanced lrc with word timings
+    [01:02.34]                        a timestamp on its own, an instrumental break that ends the previous line
+Lines with the same timestamp keep their order in the file instead of overwriting each other.
+"""
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),  # before utf-16 le, its bom starts with the same two bytes
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# tried in order when there is no bom, most lrc files that are not utf-8 come from gbk lyric sites,
+# and latin-1 accepts any bytes so something always gets displayed
+FALLBACK_ENCODINGS = ("utf-8", "gb18030", "latin-1")
+
+
+def decode_lrc(data):
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return data.decode(encoding, errors="replace")
+
+    # utf-16 without a bom, every other byte of ascii text is zero
+    if len(data) >= 4 and (data[1] == 0 and data[3] == 0 or data[0] == 0 and data[2] == 0):
+        return data.decode("utf-16-le" if data[1] == 0 else "utf-16-be", errors="replace")
+
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+
+
+def parse_timestamp(tag):
+    """'mm:ss', 'mm:ss.xx', 'mm:ss.xxx' or 'mm:ss:xx' to seconds, None if the tag is not a timestamp."""
+    # fast path for the usual mm:ss.xx
+    if len(tag) == 8 and tag[2] == ":" and tag[5] in ".:":
+        minutes, seconds, hundredths = tag[:2], tag[3:5], tag[6:]
+        if minutes.isdigit() and seconds.isdigit() and hundredths.isdigit():
+            return int(minutes) * 60 + int(seconds) + int(hundredths) / 100
+        return None
+
+    colon = tag.find(":")
+    if colon <= 0:
+        return None
+    minutes = tag[:colon]
+    rest = tag[colon + 1:]
+
+    fraction = ""
+    for separator in ".:":
+        index = rest.find(separator)
+        if index != -1:
+            rest, fraction = rest[:index], rest[index + 1:]
+            break
+
+    if not (minutes.isdigit() and rest.isdigit() and (not fraction or fraction.isdigit())):
+        return None
+    seconds = int(minutes) * 60 + int(rest)
+    if fraction:
+        seconds += int(fraction) / 10 ** len(fraction)
+    return seconds
+
+
+def parse_words(text):
+    """Split an enhanced lrc text into its plain text and a tuple of (seconds, word) pairs."""
+    words = []
+    plain = []
+    start = None
+    position = 0
+    length = len(text)
+
+    while position < length:
+        opening = text.find("<", position)
+        if opening == -1:
+            break
+        closing = text.find(">", opening)
+        if closing == -1:
+            break
+        timestamp = parse_timestamp(text[opening + 1:closing])
+        if timestamp is None:
+            # a '<' that is part of the lyric itself
+            plain.append(text[position:closing + 1])
+            position = closing + 1
+            continue
+
+        word = text[position:opening]
+        plain.append(word)
+        if start is not None and word.strip():
+            words.append((start, word))
+        start = timestamp
+        position = closing + 1
+
+    word = text[position:]
+    plain.append(word)
+    if start is not None and word.strip():
+        words.append((start, word))
+
+    return "".join(plain).strip(), tuple(words)
+
+
+def parse_lrc_text(text):
+    entries = []  # (seconds, order in the file, text, words)
+    metadata = {}
+
+    for line in text.splitlines():
+        line = line.strip()
+        timestamps = []
+
+        # all the leading [...] tags of the line
+        while line.startswith("["):
+            closing = line.find("]")
+            if closing == -1:
+                break
+            tag = line[1:closing]
+            line = line[closing + 1:].lstrip()
+
+            timestamp = parse_timestamp(tag)
+            if timestamp is not None:
+                timestamps.append(timestamp)
+            elif ":" in tag:
+                key, _, value = tag.partition(":")
+                metadata[key.strip().lower()] = value.strip()
+
+        if not timestamps:
+            continue
+
+        words = ()
+        if "<" in line:
+            line, words = parse_words(line)
+
+        for timestamp in timestamps:
+            entries.append((timestamp, len(entries), line, words))
+
+    # positive offsets make the lyrics come earlier
+    try:
+        offset = int(metadata.get("offset", 0)) / 1000
+    except ValueError:
+        offset = 0
+
+    entries.sort()
+    timeline = LyricsTimeline(
+        (max(timestamp - offset, 0.0) for timestamp, _, _, _ in entries),
+        (line for _, _, line, _ in entries),
+    )
+    timeline.metadata = metadata
+    if any(words for _, _, _, words in entries):
+        timeline.words = tuple(
+            tuple((max(start - offset, 0.0), word) for start, word in words) for _, _, _, words in entries)
+    return timeline
+
+
+def parse_lrc_file(path):
+    with open(path, "rb") as f:
+        return parse_lrc_text(decode_lrc(f.read()))
+
+
+def benchmark(paths=None, rounds=2000):
+    """
+    Parse the given lrc files, or a generated one with word timings, over and over and print the rate.
+    Run as: python lrcparser.py [file.lrc ...]
+    """
+    if paths:
+        samples = []
+        for path in paths:
+            with open(path, "rb") as f:
+                samples.append(f.read())
+    else:
+        lines = ["[ti:Benchmark]", "[ar:April]", "[offset:+120]"]
+        for second in range(0, 240, 4):
+            stamp = f"{second // 60:02d}:{second % 60:02d}.50"
+            lines.append(f"[{stamp}]<{stamp}>some <{stamp}>words <{stamp}>of a lyric line {second}")
+        samples = ["\n".join(lines).encode("utf-8")]
+
+    start = time.perf_counter()
+    parsed_lines = 0
+    for _ in range(rounds):
+        for data in samples:
+            parsed_lines += len(parse_lrc_text(decode_lrc(data)))
+    elapsed = time.perf_counter() - start
+
+    files = rounds * len(samples)
+    print(f"Parsed {files} files ({parsed_lines} lines) in {elapsed:.3f}s: "
+          f"{files / elapsed:.0f} files/s, {parsed_lines / elapsed:.0f} lines/s")
+
+
+if __name__ == "__main__":
+    benchmark([path for path in sys.argv[1:] if os.path.isfile(path)])
@@ -1,46 +1,32 @@
-import bisect
-import re
 import os
 import sys
-from PyQt6.QtWidgets import QLabel, QDialog, QVBoxLayout, QApplication, QSizePolicy, \
-    QGridLayout
-from PyQt6.QtCore import Qt, QPoint, QPropertyAnimation, QRect
-from PyQt6.QtGui import QIcon, QKeyEvent
+from functools import cached_property
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QApplication
+from PyQt6.QtCore import Qt, QObject, QTimer, QVariantAnimation, pyqtSignal
+from PyQt6.QtGui import QIcon, QKeyEvent, QPainter, QPixmap
 from getfont import GetFont
+from lyricview import LyricView
+from lyricscache import LyricsCache
 from easy_json import EasyJson
-from PIL import Image, ImageDraw, ImageFont
+from backgroundrenderer import BackgroundRenderer
 from notetaking import NoteTaking
 from clickable_label import ClickableLabel
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from dictionary import VocabularyManager
 
 
-def extract_time_and_lyric(line):
-    match = re.match(r'\[(\d{2}:\d{2}\.\d+)](.*)', line)
-    if match:
-        time_str = match.group(1)
-        lyric = match.group(2).strip()
-        return time_str, lyric
-    return None, None
-
-
-def convert_time_to_seconds(time_str):
-    minutes, seconds = map(float, time_str.split(":"))
-    return minutes * 60 + seconds
+class LyricsLoadNotifier(QObject):
+    # emitted from the loading thread with the generation and the finished future, delivered on the gui thread
+    loaded = pyqtSignal(int, object)
 
 
 class LRCSync:
     def __init__(self, parent, music_player, config_path, on_off_lyrics=None, ui_show_maximized=None):
-        self.extra_label = None
-        self.animations = None
         self.lyrics_color = None
-        self.first_time_lyric = True
         self.parent = parent
-        self.labels = []
         self.main_layout = None
         self.previous_index = 0
         self.animation_duration = 200
-        self.initial_positions = None
         self.uiShowMaximized = ui_show_maximized
         self.on_off_lyrics = on_off_lyrics
         self.config_path = config_path
@@ -50,24 +36,19 @@ class LRCSync:
         self.music_file = None
         self.music_player = music_player
 
-        # lyrics labels
-        self.lyric_label0 = None
-        self.lyric_label1 = None
-        self.lyric_label2 = None
-        self.lyric_label3 = None
-        self.lyric_label4 = None
+        self.lyric_view = None  # LyricView painting the lines in the lrc display
 
-        self.lyrics = None
-        self.lyrics_keys = None
+        self.timeline = None  # LyricsTimeline of the current lrc file
+        self.lyrics_cache = LyricsCache(config_path)
+        self.lyrics_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="lyrics")
+        self.lyrics_generation = 0  # bumped for every song, results of older loads are thrown away
         self.current_time = 0.0
         self.media_font = GetFont(13)
         self.media_lyric = ClickableLabel()
         self.media_lyric.setWordWrap(True)
         self.font_size = self.ej.get_value("lrc_font_size")
-        self.larger_font_size = int(self.font_size + 20)
         self.lrc_font = GetFont(int(self.font_size))
         self.show_lyrics = self.ej.get_value("show_lyrics")
-        self.dictionary = None
 
         self.first_lyric_text = ""
         self.current_lyric_text = ""
@@ -83,25 +64,122 @@ class LRCSync:
         self.media_lyric.setText(self.media_font.get_formatted_text(self.current_lyric_text))
 
         self.lyric_sync_connected = None
-        self.media_sync_connected = None
+        self.media_sync_connected = None  # whether the media lyric should follow playback
+        self.media_lyric_shown = False  # the main window is hidden in the tray or behind the lrc display
         self.current_lyrics_time = 0.0
-        self.last_update_time = 0.0  # Initialize with 0 or None
-        self.update_interval = float(self.ej.get_value("sync_threshold"))  # Minimum interval in seconds
+        self.early_sync_time = float(self.ej.get_value("early_sync_time"))  # show lines this many seconds early
+
+        # Instead of polling on every position tick, a single shot timer is armed for the next line
+        self.lyric_timer = QTimer()
+        self.lyric_timer.setSingleShot(True)
+        self.lyric_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.lyric_timer.timeout.connect(self.on_lyric_timer)
+        self.scheduler_running = False
+
+        self.lyrics_notifier = LyricsLoadNotifier()
+        self.lyrics_notifier.loaded.connect(self.on_lyrics_loaded)
         self.script_path = os.path.dirname(os.path.abspath(__file__))
         self.current_index = 0
 
         # Construct the full path to the icon file
         self.icon_path = os.path.join(self.script_path, 'icons', 'april-icon.png')
-        self.notetaking = NoteTaking(self)
+
+        # the lrc display's background, rendered for the screen it is on by a worker thread
+        self.background_image = self.ej.get_value("background_image")
+        self.background_renderer = BackgroundRenderer(os.path.join(self.config_path, "backgrounds"),
+                                                      os.path.join(self.script_path, "fonts", "Sexy Beauty.ttf"))
+        self.background_renderer.rendered.connect(self.on_background_rendered)
+        self.background_key = None
+        self.background_pixmap = None
+
+        # slideshow through a folder of backgrounds, with at most two decoded frames at any time:
+        # the shown one and the preloaded next one, or the old and the new one while they crossfade
+        self.background_folder = self.ej.get_value("background_folder")
+        self.slideshow_images = []
+        self.slideshow_index = 0
+        self.next_background_key = None
+        self.next_background_pixmap = None
+        self.previous_background_pixmap = None
+        self.background_fade = 1.0
+        self.slideshow_timer = QTimer()
+        self.slideshow_timer.setInterval(int(self.ej.get_value("background_interval")) * 1000)
+        self.slideshow_timer.timeout.connect(self.next_background)
+        self.fade_animation = QVariantAnimation()
+        self.fade_animation.setDuration(1000)
+        self.fade_animation.setStartValue(0.0)
+        self.fade_animation.setEndValue(1.0)
+        self.fade_animation.valueChanged.connect(self.on_background_fade)
+        self.fade_animation.finished.connect(self.on_background_faded)
         self.started_player = False
 
     def disconnect_syncing(self):
+        self.lyric_sync_connected = False
+        self.media_sync_connected = False
+        self.update_scheduler()
+
+    def disconnect_media_lyric(self):
+        self.media_sync_connected = False
+        self.update_scheduler()
+
+    def update_scheduler(self):
+        """Run the lyric scheduler only while the media lyric or the lrc display can be seen."""
+        needed = bool(self.lyric_sync_connected or (self.media_sync_connected and self.media_lyric_shown))
+        if needed and not self.scheduler_running:
+            self.scheduler_running = True
+            self.music_player.clock.add_listener(self.reschedule)
+            self.reschedule()
+        elif not needed and self.scheduler_running:
+            self.scheduler_running = False
+            self.music_player.clock.remove_listener(self.reschedule)
+            self.lyric_timer.stop()
+
+    def reschedule(self, position=None):
+        # called after seeks, play/pause and track changes: show the right line now, then wait for the next one
+        self.lyric_timer.stop()
+        self.refresh_lyrics()
+        self.arm_lyric_timer()
+
+    def on_lyric_timer(self):
+        self.refresh_lyrics()
+        self.arm_lyric_timer()
+
+    def arm_lyric_timer(self):
+        timeline = self.timeline
+        if not self.music_player.clock.playing or not timeline or self.file is None:
+            return
+
+        next_lyric_time = timeline.next_time()
+        if next_lyric_time is None:
+            return  # the last line is showing
+
+        delay = next_lyric_time - (self.music_player.get_current_time() + self.early_sync_time)
+        self.lyric_timer.start(max(int(delay * 1000) + 1, 1))
+
+    def on_lyrics_loaded(self, generation, future):
+        if generation != self.lyrics_generation:
+            return  # the song has changed while its lyrics were loading
+
+        try:
+            timeline = future.result()
+        except Exception as e:
+            print(f"Error occurred while parsing lrc file: {e}")
+            return
+
+        if timeline:
+            self.set_timeline(timeline)
+
+    def set_timeline(self, timeline):
+        # only ever replaced here on the gui thread, as a whole
+        self.timeline = timeline
+        if self.scheduler_running:
+            self.reschedule()
+
+    def refresh_lyrics(self):
+        self.get_current_lyric()
+        if self.media_sync_connected and self.media_lyric_shown:
+            self.update_media_lyric()
         if self.lyric_sync_connected:
-            self.music_player.player.positionChanged.disconnect(self.update_display_lyric)
-            self.lyric_sync_connected = False
-        if self.media_sync_connected:
-            self.music_player.player.positionChanged.disconnect(self.update_media_lyric)
-            self.media_sync_connected = False
+            self.update_display_lyric()
 
     def update_file_and_parse(self, file):
         if file is None:
@@ -111,108 +189,50 @@ class LRCSync:
 
         self.parse_lrc()
 
-    def resizeBackgroundImage(self, image_path):
-        print("In resize Image method")
-        image = Image.open(image_path)
-
-        # Get the screen geometry
-        app = QApplication.instance() or QApplication([])
-        screen_geometry = app.primaryScreen().geometry()
-
-        screen_width = screen_geometry.width()
-        screen_height = screen_geometry.height()
-
-        # Calculate the new dimensions to maintain the aspect ratio
-        aspect_ratio = image.width / image.height
-        new_width = int(screen_height * aspect_ratio)
-
-        # Resize the image
-        resized_image = image.resize((new_width, screen_height), Image.LANCZOS)
+    # Secondary windows are only built the first time they are asked for, not at startup
 
-        # Create a new image with the screen dimensions and background color
-        background_color = "black"  # Set your background color here
-        final_image = Image.new("RGB", (screen_width, screen_height), background_color)
+    @cached_property
+    def notetaking(self):
+        return NoteTaking(self)
 
-        # Calculate the position to paste the resized image onto the background
-        x_position = (screen_width - new_width) // 2
-        y_position = 0  # Keep the image vertically centered
+    @cached_property
+    def dictionary(self):
+        return VocabularyManager(parent=self)
 
-        # Paste the resized image onto the background
-        final_image.paste(resized_image, (x_position, y_position))
-
-        # Add copyright text to the final image
-        draw = ImageDraw.Draw(final_image)
-
-        # Load a custom font with a specific size
-        font_size = int(self.parent.height() * 0.06)  # Set your desired font size here
-        font_path = os.path.join(self.script_path, "fonts",
-                                 "Sexy Beauty.ttf")  # Replace with the path to your .ttf font file
-        font = ImageFont.truetype(font_path, font_size)  # Load the font with the specified size
-
-        # Define the text
-        text = "April Music Player"
-
-        # Get text size using text-box
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
+    def buildUI(self, parent):
+        # built the first time the display is opened, then only shown and hidden,
+        # so the lyric view keeps its cached paths and the background its pixmap
+        self.lrc_display = QDialog(parent)
 
-        # Define the position for the text (bottom-right corner with padding)
-        text_position = (screen_width - text_width - 10, screen_height - text_height - 10)
+        # the background is painted from a pixmap, black until the renderer has it ready
+        self.lrc_display.paintEvent = self.paint_background
 
-        # Define the stroke width and stroke color
-        stroke_width = 2  # Adjust the stroke width as needed
-        stroke_color = "black"  # Stroke color (outline)
+        self.lrc_display.setWindowIcon(QIcon(self.icon_path))
 
-        # Draw the stroke by drawing the text multiple times with a slight offset
-        for offset in range(-stroke_width, stroke_width + 1):
-            if offset == 0:
-                continue
-            draw.text((text_position[0] + offset, text_position[1]), text, font=font, fill=stroke_color)
-            draw.text((text_position[0], text_position[1] + offset), text, font=font, fill=stroke_color)
-            draw.text((text_position[0] + offset, text_position[1] + offset), text, font=font, fill=stroke_color)
+        self.main_layout = QVBoxLayout(self.lrc_display)
+        self.setup_lyric_view()
 
-        # Draw the main text
-        draw.text(text_position, text, font=font, fill="white")  # Main text color
+        # Properly connect the close event
+        self.lrc_display.closeEvent = self.closeEvent
+        self.lrc_display.keyPressEvent = self.keyPressEvent
 
-        # Save the final image
-        final_image_path = os.path.join(self.config_path, "resized_image.png")
-        final_image.save(final_image_path)
+        # a background for the right size and pixel ratio, again whenever the dialog moves to another screen
+        self.lrc_display.winId()  # creates the window handle
+        self.lrc_display.windowHandle().screenChanged.connect(lambda screen: self.update_background())
 
-        return final_image_path
+    def is_display_visible(self):
+        return self.lrc_display is not None and self.lrc_display.isVisible()
 
     def startUI(self, parent, file):
-        self.lrc_display = QDialog(parent)
+        if self.lrc_display is None:
+            self.buildUI(parent)
+
         self.lrc_display.setWindowTitle(file)
         if file is None:
             self.lrc_display.setWindowTitle("LRC Display")
 
-        image_path = self.ej.get_value("background_imagfe")
-
-        # Check if the image path is not set or the file does not exist
-        if not image_path or not os.path.exists(image_path):
-            self.ej.setupBackgroundImage()
-            image_path = self.ej.get_value("background_image")
-
-        resized_image_path = os.path.join(self.config_path, "resized_image.png")
-        if not os.path.exists(resized_image_path):
-            resized_image_path = self.resizeBackgroundImage(image_path)
-
-        # Check if the OS is Windows
-        if os.name == 'nt':  # 'nt' stands for Windows
-            resized_image_path = resized_image_path.replace("\\", "/")  # တော်တော်သောက်လုပ်ရှပ်တဲ့ window
-
-        self.lrc_display.setStyleSheet(f"""
-            QDialog {{
-                background-color: black;  /* Black background color */
-                background-image: url({resized_image_path});
-                background-repeat: no-repeat;
-                background-position: center;
-                background-size: 100% auto;  /* Fix the image height to the dialog's height */                
-            }}
-        """)
-
-        self.lrc_display.setWindowIcon(QIcon(self.icon_path))
+        # opens in a window again even if it was closed in full screen
+        self.lrc_display.setWindowState(Qt.WindowState.WindowNoState)
 
         # Calculate the width and height of the dialog
         dialog_width = int(parent.width() * 0.9)
@@ -233,37 +253,163 @@ class LRCSync:
         self.lrc_display.setGeometry(position_x, position_y, dialog_width, dialog_height)
         self.lrc_display.setFixedSize(dialog_width, dialog_height)
 
-        self.main_layout = QVBoxLayout(self.lrc_display)
-        self.setup_lyrics_labels()
-
         if self.show_lyrics:
             if self.started_player:
-                self.lyric_label2.setText(self.lrc_font.get_formatted_text(self.current_lyric_text))
+                self.lyric_view.set_message(self.current_lyric_text)
             else:
-                self.lyric_label2.setText(self.lrc_font.get_formatted_text("April Music Player"))
+                self.lyric_view.set_message("April Music Player")
 
-            self.music_player.player.positionChanged.connect(self.update_display_lyric)
             self.lyric_sync_connected = True
+            self.update_scheduler()
         else:
-            self.lyric_label2.setText(self.lrc_font.get_formatted_text("Lyrics Disabled"))
+            self.lyric_view.set_message("Lyrics Disabled")
 
-        # Properly connect the close event
-        self.lrc_display.closeEvent = self.closeEvent
-        self.lrc_display.keyPressEvent = self.keyPressEvent
+        self.start_slideshow()
+        self.update_background()
 
         self.lrc_display.exec()
 
+    def set_background_image(self, image_path):
+        self.background_image = image_path
+        self.background_folder = ""  # a single image ends the slideshow
+        self.stop_slideshow()
+        self.update_background()
+
+    def set_background_folder(self, folder):
+        self.background_folder = folder
+        if self.is_display_visible():
+            self.stop_slideshow()
+            self.start_slideshow()
+            self.update_background()
+
+    def background_size(self):
+        if self.lrc_display is not None:
+            screen = self.lrc_display.screen()
+        else:
+            screen = QApplication.primaryScreen()  # rendered ahead of time for the next time the display opens
+        geometry = screen.geometry()
+        ratio = screen.devicePixelRatio()
+        return int(geometry.width() * ratio), int(geometry.height() * ratio), ratio
+
+    def update_background(self):
+        image_path = self.background_image
+        # Check if the image path is not set or the file does not exist
+        if not image_path or not os.path.exists(image_path):
+            self.ej.setupBackgroundImage()
+            image_path = self.background_image = self.ej.get_value("background_image")
+
+        size = self.background_size()
+        if self.background_pixmap is not None and self.background_key == self.background_renderer.variant_key(
+                image_path, *size):
+            return  # reopened on the same screen, the pixmap from last time is still right
+
+        # the previous pixmap stays until the new one arrives, so there is never a blank frame
+        self.background_key = self.background_renderer.request(image_path, *size, persist=not self.slideshow_images)
+
+        # a preloaded slide for another screen is of no use
+        self.next_background_key = None
+        self.next_background_pixmap = None
+
+    def on_background_rendered(self, key, image):
+        if key == self.background_key:
+            self.background_pixmap = QPixmap.fromImage(image)
+            if self.lrc_display is not None:
+                self.lrc_display.update()
+            if self.previous_background_pixmap is None:
+                self.preload_next_background()
+        elif key == self.next_background_key:
+            self.next_background_pixmap = QPixmap.fromImage(image)
+        # anything else is from an older request, the background or the screen has changed since
+
+    def start_slideshow(self):
+        folder = self.background_folder
+        if not folder or not os.path.isdir(folder):
+            return
+
+        image_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+        self.slideshow_images = [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+                                 if name.lower().endswith(image_extensions)]
+        if len(self.slideshow_images) < 2:
+            self.slideshow_images = []
+            return
+
+        # carry on from the slide that was shown last time
+        if self.background_image in self.slideshow_images:
+            self.slideshow_index = self.slideshow_images.index(self.background_image)
+        else:
+            self.slideshow_index = 0
+        self.background_image = self.slideshow_images[self.slideshow_index]
+        self.slideshow_timer.start()
+
+    def stop_slideshow(self):
+        self.slideshow_timer.stop()
+        self.fade_animation.stop()
+        self.slideshow_images = []
+        self.next_background_key = None
+        self.next_background_pixmap = None
+        self.previous_background_pixmap = None
+        self.background_fade = 1.0
+
+    def preload_next_background(self):
+        # decoded and scaled by the renderer's worker thread, ready before the timer fires
+        if not self.slideshow_images or self.next_background_key is not None:
+            return
+        next_index = (self.slideshow_index + 1) % len(self.slideshow_images)
+        self.next_background_key = self.background_renderer.request(self.slideshow_images[next_index],
+                                                                    *self.background_size(), persist=False)
+
+    def next_background(self):
+        if self.next_background_pixmap is None:
+            return  # still being decoded, the slide stays until the next tick
+
+        self.slideshow_index = (self.slideshow_index + 1) % len(self.slideshow_images)
+        self.background_image = self.slideshow_images[self.slideshow_index]
+
+        self.previous_background_pixmap = self.background_pixmap
+        self.background_pixmap = self.next_background_pixmap
+        self.background_key = self.next_background_key
+        self.next_background_pixmap = None
+        self.next_background_key = None
+
+        self.background_fade = 0.0
+        self.fade_animation.start()
+
+    def on_background_fade(self, value):
+        self.background_fade = value
+        if self.lrc_display is not None:
+            self.lrc_display.update()
+
+    def on_background_faded(self):
+        # the old slide is gone, which leaves room to preload the one after
+        self.previous_background_pixmap = None
+        self.background_fade = 1.0
+        self.preload_next_background()
+
+    def draw_background(self, painter, pixmap):
+        # centered at its own size like the stylesheet background before
+        size = pixmap.deviceIndependentSize()
+        x = (self.lrc_display.width() - size.width()) / 2
+        y = (self.lrc_display.height() - size.height()) / 2
+        painter.drawPixmap(int(x), int(y), pixmap)
+
+    def paint_background(self, event):
+        painter = QPainter(self.lrc_display)
+        painter.fillRect(self.lrc_display.rect(), Qt.GlobalColor.black)
+        if self.previous_background_pixmap is not None:
+            self.draw_background(painter, self.previous_background_pixmap)
+            painter.setOpacity(self.background_fade)
+        if self.background_pixmap is not None:
+            self.draw_background(painter, self.background_pixmap)
+        painter.end()
+
     def closeEvent(self, event):
         self.uiShowMaximized()
         print("QDialog closed")
-        self.lyric_label1 = None
-        self.lyric_label2 = None
-        self.lyric_label3 = None
-        self.lrc_display = None
+        self.stop_slideshow()
 
-        if self.lyric_sync_connected:
-            self.music_player.player.positionChanged.disconnect(self.update_display_lyric)
-            self.lyric_sync_connected = False
+        # the dialog is only hidden, it stops following the clock until it is shown again
+        self.lyric_sync_connected = False
+        self.update_scheduler()
 
         event.accept()  # To accept the close event
 
@@ -272,18 +418,19 @@ class LRCSync:
             print("left key pressed")
             self.music_player.seek_backward()
 
-        elif event.key() == Qt.Key.Key_Y and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
-            self.create_animations(direction="down")
-
         elif event.key() == Qt.Key.Key_D and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
             self.music_player.pause()  # pause the music first
-            if self.dictionary is None:
-                self.dictionary = VocabularyManager(parent=self)
             self.dictionary.exec()
 
         elif event.key() == Qt.Key.Key_Q and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
             self.parent.exit_app()
 
+        elif event.key() == Qt.Key.Key_C and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            self.lyric_view.copy_current_line()  # e.g. to look it up in the dictionary or paste into notes
+
+        elif event.key() == Qt.Key.Key_Y and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            self.lyric_view.replay_scroll()
+
         elif event.key() == Qt.Key.Key_Right:
             print("right key pressed")
             self.music_player.seek_forward()
@@ -334,20 +481,19 @@ class LRCSync:
             print("disabled lyrics")
             if self.show_lyrics:
                 self.on_off_lyrics(False)
-                self.music_player.player.positionChanged.disconnect(self.update_display_lyric)
-                self.lyric_label2.setText(self.lrc_font.get_formatted_text("Lyrics Disabled"))
+                self.lyric_view.set_message("Lyrics Disabled")
                 self.lyric_sync_connected = False
             else:
                 self.on_off_lyrics(True)
-                self.music_player.player.positionChanged.connect(self.update_display_lyric)
                 self.lyric_sync_connected = True
+            self.update_scheduler()
 
     def restart_music(self):
         print("restart music hits")
         if self.music_player.in_pause_state:
             self.music_player.play_pause_music()
             self.music_player.in_pause_state = False
-        self.music_player.player.setPosition(0)
+        self.music_player.set_position(0)
 
     def createNoteTakingWindow(self):
         self.notetaking.createUI()
@@ -366,55 +512,7 @@ class LRCSync:
         # Return the result
         return is_full_screen_mode
 
-    def setup_lyrics_labels(self):
-        # Create and configure self.lyric_label1
-        self.lyric_label0 = QLabel()
-        self.lyric_label0.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-        self.lyric_label0.setWordWrap(True)
-        self.lyric_label0.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lyric_label0.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
-
-        # Create and configure self.lyric_label1
-        self.lyric_label1 = QLabel()
-        self.lyric_label1.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-        self.lyric_label1.setWordWrap(True)
-        self.lyric_label1.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lyric_label1.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
-
-        # Create and configure self.lyric_label2
-        self.lyric_label2 = QLabel()
-        self.lyric_label2.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-        self.lyric_label2.setWordWrap(True)
-        self.lyric_label2.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lyric_label2.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
-
-        # Create and configure self.lyric_label3
-        self.lyric_label3 = QLabel()
-        self.lyric_label3.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-        self.lyric_label3.setWordWrap(True)
-        self.lyric_label3.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lyric_label3.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-
-        # Create and configure self.lyric_label3
-        self.lyric_label4 = QLabel()
-        self.lyric_label4.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-        self.lyric_label4.setWordWrap(True)
-        self.lyric_label4.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lyric_label4.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
-
-        self.labels.extend(
-            [self.lyric_label0, self.lyric_label1, self.lyric_label2, self.lyric_label3, self.lyric_label4])
-
-        # Add the labels to the layout
-        self.main_layout.addWidget(self.lyric_label0)
-        self.main_layout.addWidget(self.lyric_label1)
-        self.main_layout.addWidget(self.lyric_label2)
-        self.main_layout.addWidget(self.lyric_label3)
-        self.main_layout.addWidget(self.lyric_label4)
-
-        # Set alignment for the entire layout
-        self.main_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
+    def setup_lyric_view(self):
         #  for lyrics color
         self.lyrics_color = self.ej.get_value("lyrics_color")
 
@@ -422,167 +520,100 @@ class LRCSync:
             self.ej.setupLyricsColor()
             self.lyrics_color = self.ej.get_value("lyrics_color")
 
-        #  setting colors for each lyric label
-        self.lyric_label0.setStyleSheet("color: gray")
-        self.lyric_label1.setStyleSheet("color: gray")
-        self.lyric_label2.setStyleSheet(f"color: {self.lyrics_color};")
-        self.lyric_label3.setStyleSheet("color: gray")
-        self.lyric_label4.setStyleSheet("color: gray")
-
-        # self.set_initial_positions()
-
-    def update_lyrics_after_animation(self, direction):
-        """
-        Update the lyrics after the animation has finished.
-        """
-        # Adjust styles based on the direction of movement
-        if direction == "up":
-            self.lyric_label2.setStyleSheet("color: gray; font-size: 16px;")  # Remove highlight from above label
-        elif direction == "down":
-            self.lyric_label3.setStyleSheet(f"color: gray; font-size: {self.font_size}px;")  # Remove highlight from
-            # below label
+        self.lyric_view = LyricView(self.lrc_font, self.lyrics_color, self.animation_duration)
+        self.main_layout.addWidget(self.lyric_view)
+        self.ej.subscribe("lyrics_color", lambda key, color: self.set_lyrics_color(color))
 
-        # Reapply highlight to the current label
-        self.lyric_label2.setStyleSheet(f"color: {self.lyrics_color}; font-size: {self.font_size}px;"
-                                        f" font-weight: bold;")
-
-        self.update_labels_text()
+    def set_lyrics_color(self, color):
+        self.lyrics_color = color
+        if self.lyric_view is not None:
+            self.lyric_view.set_lyrics_color(color)
 
     def go_to_previous_lyric(self, direction="up"):
-        if self.lyrics and self.lyric_sync_connected:
-            if self.current_lyric_text == self.lyrics[self.lyrics_keys[0]]:
+        timeline = self.timeline
+        if timeline and self.lyric_sync_connected:
+            line = self.current_index - 1  # -1 during the instrumental intro
+            if line <= 0:
                 self.restart_music()
                 return
-            else:
-                if self.current_lyrics_time == 0.0:
-                    self.current_lyrics_time = self.lyrics_keys[0]
-                previous_lyric_index = self.lyrics_keys.index(self.current_lyrics_time) - 1
-
-            if not previous_lyric_index < 0:
-                previous_lyrics_key = self.lyrics_keys[previous_lyric_index]
-                self.music_player.player.setPosition(int(previous_lyrics_key * 1000))
-
-                # fix the late to set current time due to slower sync time
-                self.current_lyrics_time = self.lyrics_keys[previous_lyric_index]
-                self.current_lyric_text = self.lyrics[self.current_lyrics_time]
-
-            else:
-                self.current_lyrics_time = self.lyrics_keys[-1]
-                previous_lyrics_key = self.lyrics_keys[-1]
-                self.music_player.player.setPosition(int(previous_lyrics_key * 1000))
 
-            if self.music_player.in_pause_state:
-                self.music_player.paused_position = int(previous_lyrics_key * 1000)
+            self.go_to_line(timeline, line - 1)
 
     def go_to_next_lyric(self, direction="down"):
-        if self.lyrics and self.lyric_sync_connected:
-            if self.current_lyric_text == "(Instrumental Intro)":
-                next_lyric_index = 0
-            else:
-                next_lyric_index = self.lyrics_keys.index(self.current_lyrics_time) + 1
-
-            if self.current_lyric_text == self.lyrics[self.lyrics_keys[-1]]:
+        timeline = self.timeline
+        if timeline and self.lyric_sync_connected:
+            line = self.current_index - 1
+            if line >= len(timeline) - 1:
                 self.restart_music()
                 return
 
-            if not len(self.lyrics_keys) < (next_lyric_index + 1):
-                next_lyric_key = self.lyrics_keys[next_lyric_index]
-                print("next line, ", next_lyric_key)
-                self.music_player.player.setPosition(int(next_lyric_key * 1000))
+            self.go_to_line(timeline, line + 1)
 
-                # fix the late to set current time due to slower sync time
-                self.current_lyrics_time = self.lyrics_keys[next_lyric_index]
-                self.current_lyric_text = self.lyrics[self.current_lyrics_time]
-            else:
-                self.current_lyrics_time = self.lyrics_keys[0]
-                next_lyric_key = self.lyrics_keys[0]
-                self.music_player.player.setPosition(int(next_lyric_key * 1000))
+    def go_to_line(self, timeline, line):
+        lyric_time = timeline.time_at(line)
+        self.music_player.set_position(int(lyric_time * 1000))
 
-            if self.music_player.in_pause_state:
-                self.music_player.paused_position = int(next_lyric_key * 1000)
+        # fix the late to set current time due to slower sync time
+        timeline.move_to(line + 1)
+        self.current_index = line + 1
+        self.current_lyrics_time = lyric_time
+        self.current_lyric_text = timeline.text_at(line)
+
+        if self.music_player.in_pause_state:
+            self.music_player.paused_position = int(lyric_time * 1000)
 
     def go_to_the_start_of_current_lyric(self):
-        self.music_player.player.setPosition(int(self.current_lyrics_time * 1000))
+        self.music_player.set_position(int(self.current_lyrics_time * 1000))
 
     def parse_lrc(self):
-        parse_thread = threading.Thread(target=self.parse_lrc_base)
-        parse_thread.start()  # Starts the thread to run the method
-
-    def parse_lrc_base(self):
-        lyrics_dict = {}
+        self.lyrics_generation += 1
+        generation = self.lyrics_generation
+        self.timeline = None  # never show the previous song's lyrics while loading
 
         if self.file is None:
             print("lrc file not found, attempting to download")
-            self.lyrics = None
-            pass
+            return
 
-        else:
-            try:
-                with open(self.file, 'r', encoding='utf-8-sig') as file:
-                    for line in file:
-                        time_str, lyric = extract_time_and_lyric(line)
-                        if time_str and lyric:
-                            time_in_seconds = convert_time_to_seconds(time_str)
-                            lyrics_dict[time_in_seconds] = lyric
-
-                if lyrics_dict:
-                    self.lyrics = lyrics_dict
-                    self.lyrics_keys = sorted(self.lyrics.keys())
-
-            except Exception as e:
-                print(f"Error occurred while parsing lrc file: {e}")
-                self.lyrics = None
+        # songs played recently or prefetched are still parsed in memory, no need for a thread
+        timeline = self.lyrics_cache.get_cached(self.file)
+        if timeline is not None:
+            if timeline:
+                self.set_timeline(timeline)
+            return
 
-    def get_current_lyric(self):
-        # Ensure that we have a valid file and lyrics before proceeding
-        if self.file is not None and self.lyrics:
-            self.current_time = self.music_player.get_current_time()
+        future = self.lyrics_executor.submit(self.lyrics_cache.load, self.file)
+        future.add_done_callback(lambda done: self.lyrics_notifier.loaded.emit(generation, done))
 
-            # Only update if the current time has moved beyond the update interval
-            abs_value = abs(self.current_time - self.last_update_time)
-            if abs_value < self.update_interval:
-                return  # Skip updating if within the interval
+    def prefetch_lyrics(self, file):
+        """Load the lyrics of an upcoming song in the background, so they are ready the moment it starts."""
+        if file is not None and self.lyrics_cache.get_cached(file) is None:
+            self.lyrics_executor.submit(self.lyrics_cache.load, file)
 
-            self.last_update_time = self.current_time  # Update the last updated time
+    def get_current_lyric(self):
+        timeline = self.timeline
+        # Ensure that we have a valid file and lyrics before proceeding
+        if self.file is not None and timeline:
+            self.current_time = self.music_player.get_current_time() + self.early_sync_time
 
-            # Use binary search to find the correct lyrics time
-            index = bisect.bisect_right(self.lyrics_keys, self.current_time)
+            # Usually the same or the following line, the timeline only bisects after a seek
+            index = timeline.seek(self.current_time)
             self.current_index = index  # Store the current lyric index for note-taking
 
-            # Handle the case when the index is at the beginning
             if index == 0:
-                if self.current_time < self.lyrics_keys[0]:  # For instrumental section before first lyric
-                    self.current_lyric_text = "(Instrumental Intro)"
-                    self.previous_lyric_text = ""
-                    self.next_lyric_text = self.lyrics.get(self.lyrics_keys[0], "")
-
-            elif index == 1:
-                # Before the first lyric but not before the first time
-                self.previous_lyric_text = "(Instrumental Intro)"
-                self.current_lyrics_time = self.lyrics_keys[0]
-                self.current_lyric_text = self.lyrics.get(self.current_lyrics_time, "")
-                self.next_lyric_text = self.lyrics.get(self.lyrics_keys[1], "")
-
-            # Handle the case when we have lyrics
-            elif index < len(self.lyrics_keys):
-                self.current_lyrics_time = self.lyrics_keys[index - 1]
-                self.current_lyric_text = self.lyrics.get(self.current_lyrics_time, "")
-                self.previous_lyric_text = self.lyrics.get(self.lyrics_keys[index - 2], "")
-                self.next_lyric_text = self.lyrics.get(self.lyrics_keys[index], "")
-
-                # Safely retrieve surrounding lyrics, if available
-                if index - 3 >= 0:
-                    self.first_lyric_text = self.lyrics.get(self.lyrics_keys[index - 3], "")
-                if index + 1 < len(self.lyrics_keys):
-                    self.last_lyric_text = self.lyrics.get(self.lyrics_keys[index + 1], "")
-
+                # For instrumental section before first lyric
+                self.first_lyric_text = ""
+                self.previous_lyric_text = ""
+                self.current_lyrics_time = 0.0
+                self.current_lyric_text = "(Instrumental Intro)"
             else:
-                # If the current time is after the last lyric
-                self.previous_lyric_text = self.lyrics.get(self.lyrics_keys[-1], "")
-                self.current_lyrics_time = self.lyrics_keys[-1]
-                self.current_lyric_text = self.lyrics.get(self.current_lyrics_time, "")
-                self.next_lyric_text = ""
-                self.first_lyric_text = self.lyrics.get(self.lyrics_keys[-2], "")
+                self.first_lyric_text = timeline.text_at(index - 3)
+                self.previous_lyric_text = timeline.text_at(index - 2) if index > 1 else "(Instrumental Intro)"
+                self.current_lyrics_time = timeline.time_at(index - 1)
+                self.current_lyric_text = timeline.text_at(index - 1)
+
+            # past the last lyric these are empty
+            self.next_lyric_text = timeline.text_at(index)
+            self.last_lyric_text = timeline.text_at(index + 1)
 
         else:
             # Handle the case when no valid lyrics are found
@@ -593,100 +624,27 @@ class LRCSync:
             self.last_lyric_text = ""
 
     def update_media_lyric(self):
-        self.get_current_lyric()
         self.media_lyric.setText(self.media_font.get_formatted_text(self.current_lyric_text))
 
     def update_display_lyric(self):
-        if self.previous_index == self.current_index:
-            if self.first_time_lyric:
-                self.first_time_lyric = False
-                self.update_labels_text()
-            else:
-                print("skipping to update text")
-                return
-        else:
-            self.create_animations(direction="down")
-
+        # the view only repaints when one of the lines has actually changed, and scrolls when playback moved on by one
+        self.update_labels_text(scroll=self.current_index == self.previous_index + 1)
         self.previous_index = self.current_index
 
-    def update_labels_text(self):
-        if self.lyric_label0 is not None:
-            self.lyric_label0.setText(self.lrc_font.get_formatted_text(self.first_lyric_text))
-        if self.lyric_label2 is not None:
-            self.lyric_label2.setText(self.lrc_font.get_formatted_text(self.current_lyric_text))
-        if self.lyric_label1 is not None:
-            self.lyric_label1.setText(self.lrc_font.get_formatted_text(self.previous_lyric_text))
-        if self.lyric_label3 is not None:
-            self.lyric_label3.setText(self.lrc_font.get_formatted_text(self.next_lyric_text))
-        if self.lyric_label4 is not None:
-            self.lyric_label4.setText(self.lrc_font.get_formatted_text(self.last_lyric_text))
-
-    def create_animations(self, direction):
-        """Create and start animations for the labels moving up or down."""
-        # Create animations for all 5 labels
-
-        self.extra_label = QLabel()
-
-        self.animations = []
-
-        anim_label0 = QPropertyAnimation(self.lyric_label0, b"pos")
-        anim_label1 = QPropertyAnimation(self.lyric_label1, b"pos")
-        anim_label2 = QPropertyAnimation(self.lyric_label2, b"pos")
-        anim_label3 = QPropertyAnimation(self.lyric_label3, b"pos")
-        anim_label4 = QPropertyAnimation(self.lyric_label4, b"pos")
-
-        # Set the start positions for all labels
-        anim_label0.setStartValue(self.lyric_label0.pos())
-        anim_label1.setStartValue(self.lyric_label1.pos())
-        anim_label2.setStartValue(self.lyric_label2.pos())
-        anim_label3.setStartValue(self.lyric_label3.pos())
-        anim_label4.setStartValue(self.lyric_label4.pos())
-
-        # Define animation durations
-        anim_label0.setDuration(self.animation_duration)
-        anim_label1.setDuration(self.animation_duration)
-        anim_label2.setDuration(self.animation_duration)
-        anim_label3.setDuration(self.animation_duration)
-        anim_label4.setDuration(self.animation_duration)
-
-        # Define the end positions based on direction
-        if direction == "up":
-            # Move labels up
-            anim_label0.setEndValue(self.lyric_label1.pos())
-            anim_label1.setEndValue(self.lyric_label2.pos())
-            anim_label2.setEndValue(self.lyric_label3.pos())
-            anim_label3.setEndValue(self.lyric_label4.pos())
-            anim_label4.setEndValue(QPoint(105, 305))  # Move label5 off the view
-
-            # Connect animation completion to update labels
-            anim_label4.finished.connect(lambda: self.update_lyrics_after_animation("up"))
-
-        elif direction == "down":
-            print("the larger font size is ", self.larger_font_size)
-            print("The normal font size is ", self.font_size)
-            self.lyric_label2.setStyleSheet("color: gray;")  # Remove highlight from current
-            self.lyric_label3.setStyleSheet(f"color: {self.lyrics_color}; font-size: {self.larger_font_size}px;")  # Highlight below label
-
-            # Move labels down
-            anim_label0.setEndValue(QPoint(0, -20))  # Move label1 off the view
-            anim_label1.setEndValue(self.lyric_label0.pos())
-            anim_label2.setEndValue(self.lyric_label1.pos())
-            anim_label3.setEndValue(self.lyric_label2.pos())
-            anim_label4.setEndValue(self.lyric_label3.pos())
-
-            # Connect animation completion to update labels
-            anim_label0.finished.connect(lambda: self.update_lyrics_after_animation("down"))
-
-        # Add animations to the list and start them
-        self.animations.extend([anim_label0, anim_label1, anim_label2, anim_label3, anim_label4])
-        for anim in self.animations:
-            anim.start()
+    def update_labels_text(self, scroll=False):
+        if self.lyric_view is not None:
+            self.lyric_view.set_lines([self.first_lyric_text, self.previous_lyric_text, self.current_lyric_text,
+                                       self.next_lyric_text, self.last_lyric_text], scroll)
 
     def sync_lyrics(self, file):
         self.update_file_and_parse(file)
-        if self.media_sync_connected:
-            self.music_player.player.positionChanged.disconnect(self.update_media_lyric)
-            self.media_sync_connected = False
-
-        self.music_player.player.positionChanged.connect(self.update_media_lyric)
         self.media_sync_connected = True
+        if self.scheduler_running:
+            self.reschedule()  # a new song, start over from its first line
+        else:
+            self.update_scheduler()
+
+    def set_media_lyric_shown(self, shown):
+        # only spend time on the media lyric while someone can see it, it catches up when shown again
+        self.media_lyric_shown = shown
+        self.update_scheduler()
@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from lrcparser import parse_lrc_file
+from lyricstimeline import LyricsTimeline
+
+
+class LyricsCache:
+    """
+    Parsed lrc files, kept in memory for the most recent songs and on disk in databases/lyrics.db.
+    Entries are keyed by the lrc path together with its size and modification time,
+    so an edited or replaced lrc file is parsed again.
+    """
+
+    def __init__(self, config_path, memory_entries=64):
+        self.db_path = os.path.join(config_path, "databases", "lyrics.db")
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()  # path -> (size, mtime_ns, timeline), least recently used first
+        self.lock = threading.Lock()
+        self.embedded_loader = None  # callable(audio path) -> timeline of its embedded lyrics, from the song catalogue
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.parses = 0
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS lyrics (
+                        lrc_path TEXT PRIMARY KEY,
+                        size INTEGER,
+                        mtime_ns INTEGER,
+                        times BLOB,
+                        texts TEXT,
+                        metadata TEXT,
+                        words TEXT
+                    );
+                ''')
+        except sqlite3.Error as e:
+            print(f"Lyrics cache database error: {e}")
+
+    @staticmethod
+    def file_key(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get_cached(self, path):
+        """The timeline from memory if it is there and still up to date, without touching the disk cache."""
+        try:
+            size, mtime_ns = self.file_key(path)
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.memory.get(path)
+            if entry is None or entry[0] != size or entry[1] != mtime_ns:
+                return None
+            self.memory.move_to_end(path)
+            self.memory_hits += 1
+            timeline = entry[2]
+
+        timeline.move_to(0)
+        return timeline
+
+    def load(self, path):
+        """The parsed timeline of an lrc file, from memory, the database or by parsing it. Safe to call from any thread."""
+        timeline = self.get_cached(path)
+        if timeline is not None:
+            return timeline
+
+        size, mtime_ns = self.file_key(path)
+        if not path.lower().endswith(".lrc"):
+            # lyrics embedded in an audio file, the library scan has already parsed them
+            timeline = self.embedded_loader(path) if self.embedded_loader else None
+            timeline = timeline or LyricsTimeline()
+            with self.lock:
+                self.disk_hits += 1
+            self.remember(path, size, mtime_ns, timeline)
+            return timeline
+
+        timeline = self.read_from_database(path, size, mtime_ns)
+        if timeline is not None:
+            with self.lock:
+                self.disk_hits += 1
+        else:
+            timeline = parse_lrc_file(path)
+            with self.lock:
+                self.parses += 1
+            self.write_to_database(path, size, mtime_ns, timeline)
+
+        self.remember(path, size, mtime_ns, timeline)
+        return timeline
+
+    def remember(self, path, size, mtime_ns, timeline):
+        with self.lock:
+            self.memory[path] = (size, mtime_ns, timeline)
+            self.memory.move_to_end(path)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def read_from_database(self, path, size, mtime_ns):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute('''
+                    SELECT times, texts, metadata, words FROM lyrics
+                    WHERE lrc_path = ? AND size = ? AND mtime_ns = ?
+                ''', (path, size, mtime_ns)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Lyrics cache database error: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        times, texts, metadata, words = row
+        timeline = LyricsTimeline()
+        timeline.times.frombytes(times)
+        timeline.texts = tuple(texts.split("\n")) if timeline.times else ()  # lrc lines never contain newlines
+        timeline.metadata = json.loads(metadata)
+        if words is not None:
+            timeline.words = tuple(tuple((start, word) for start, word in line) for line in json.loads(words))
+        return timeline
+
+    def write_to_database(self, path, size, mtime_ns, timeline):
+        words = None
+        if timeline.words is not None:
+            words = json.dumps(timeline.words)
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('''
+                    REPLACE INTO lyrics (lrc_path, size, mtime_ns, times, texts, metadata, words)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (path, size, mtime_ns, timeline.times.tobytes(), "\n".join(timeline.texts),
+                      json.dumps(timeline.metadata), words))
+        except sqlite3.Error as e:
+            print(f"Lyrics cache database error: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "parses": self.parses,
+                "memory_entries": len(self.memory),
+            }
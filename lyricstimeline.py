@@ -0,0 +1,82 @@
+import bisect
+import json
+import struct
+from array import array
+
+
+class LyricsTimeline:
+    """
+    The parsed lines of one lrc file: timestamps in seconds in a flat array('d'), sorted,
+    and the texts in a tuple at the same indexes.
+
+    A cursor remembers how many lines have started at the last synced position. While a song simply
+    plays on, the next sync only ever moves it by one line, so that is checked first and bisect is
+    only needed after a seek.
+    """
+
+    def __init__(self, times=(), texts=()):
+        self.times = array('d', times)
+        self.texts = tuple(texts)
+        self.cursor = 0  # number of lines that have started, the current line is cursor - 1
+        self.metadata = {}  # id tags such as ar, ti, al, offset
+        self.words = None  # per line, a tuple of (seconds, word) for enhanced lrc files
+
+    def to_bytes(self):
+        """Serialized as the count and raw timestamps, followed by texts, metadata and word timings as json."""
+        rest = json.dumps([self.texts, self.metadata, self.words], ensure_ascii=False).encode("utf-8")
+        return struct.pack("<I", len(self.times)) + self.times.tobytes() + rest
+
+    @classmethod
+    def from_bytes(cls, data):
+        count, = struct.unpack_from("<I", data)
+        end = 4 + count * 8
+        texts, metadata, words = json.loads(data[end:].decode("utf-8"))
+
+        timeline = cls((), texts)
+        timeline.times.frombytes(data[4:end])
+        timeline.metadata = metadata
+        if words is not None:
+            timeline.words = tuple(tuple((start, word) for start, word in line) for line in words)
+        return timeline
+
+    def __len__(self):
+        return len(self.times)
+
+    def __bool__(self):
+        return len(self.times) > 0
+
+    def seek(self, position):
+        """Move the cursor to the given position in seconds and return it."""
+        times = self.times
+        cursor = self.cursor
+        count = len(times)
+
+        # still on the same line
+        if (cursor == 0 or times[cursor - 1] <= position) and (cursor == count or position < times[cursor]):
+            return cursor
+
+        # playback moved on to the next line
+        if cursor < count and times[cursor] <= position and (cursor + 1 == count or position < times[cursor + 1]):
+            self.cursor = cursor + 1
+            return self.cursor
+
+        # a seek
+        self.cursor = bisect.bisect_right(times, position)
+        return self.cursor
+
+    def move_to(self, cursor):
+        self.cursor = min(max(cursor, 0), len(self.times))
+
+    def time_at(self, index):
+        if 0 <= index < len(self.times):
+            return self.times[index]
+        return None
+
+    def text_at(self, index):
+        if 0 <= index < len(self.texts):
+            return self.texts[index]
+        return ""
+
+    def next_time(self):
+        """Start of the line after the current one, None once the last line is showing."""
+        return self.time_at(self.cursor)
@@ -0,0 +1,217 @@
+from collections import OrderedDict
+import re
+from PyQt6.QtWidgets import QWidget, QSizePolicy, QApplication, QMenu
+from PyQt6.QtCore import Qt, QPointF, QRectF, QVariantAnimation, QEasingCurve
+from PyQt6.QtGui import QPainter, QPainterPath, QPen, QColor, QFontMetricsF
+
+"""
+The lyrics of the lrc display, painted instead of shown in rich text labels.
+
+Every line is turned into a QPainterPath once for its text, fonts and the width it wraps at,
+and kept in a small cache, so painting is a stroke and a fill of a few cached paths per line.
+The stroke gives the lyrics an outline that keeps them readable on any background image.
+
+Moving on to the next line scrolls all lines up with one animation that lives as long as the view,
+it only animates an offset that painting adds to the line positions.
+
+Painted lines cannot be selected with the mouse, their text is copied from the context menu
+(the line under the cursor, or all shown lines) or with copy_current_line().
+"""
+
+WORD_BREAKS = re.compile(r'(\s+)')
+
+
+class LyricView(QWidget):
+    LINE_COUNT = 5  # first, previous, current, next, last
+    CURRENT_LINE = 2
+    PATH_CACHE_SIZE = 256
+
+    def __init__(self, get_font, lyrics_color="white", animation_duration=200, parent=None):
+        super().__init__(parent)
+        self.get_font = get_font  # GetFont, decides which font draws which characters
+        self.lyrics_color = QColor(lyrics_color)
+        self.other_color = QColor("gray")
+        self.outline_color = QColor("black")
+
+        self.lines = [""] * self.LINE_COUNT
+        self.line_rects = []  # (index, QRectF) of the lines drawn by the last paint, for the context menu
+        self.paths = OrderedDict()  # (text, fonts, width) -> (QPainterPath, height)
+
+        self.offset = 0.0  # pixels all lines are drawn below their resting place, while scrolling
+        self.scroll_animation = QVariantAnimation(self)
+        self.scroll_animation.setDuration(animation_duration)
+        self.scroll_animation.setEasingCurve(QEasingCurve.Type.OutCubic)
+        self.scroll_animation.valueChanged.connect(self.on_scroll)
+
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)  # the dialog's background image shows through
+
+    def set_lines(self, lines, scroll=False):
+        """Show new lines, with scroll=True when they are the previous ones moved up by one."""
+        lines = [str(line) for line in lines]
+        if lines == self.lines:
+            return
+
+        if scroll and self.isVisible():
+            # start with the new current line where the next line was drawn, then glide to the middle
+            width = self.width() - 40
+            spacing = self.line_spacing()
+            old_height = self.line_height(self.lines[self.CURRENT_LINE], width)
+            new_height = self.line_height(lines[self.CURRENT_LINE], width)
+            old_next_top = (self.height() - old_height) / 2 + self.offset + old_height + spacing
+            start = old_next_top - (self.height() - new_height) / 2
+
+            # a line that comes before the previous scroll has finished continues from where it is
+            self.scroll_animation.stop()
+            self.scroll_animation.setStartValue(float(start))
+            self.scroll_animation.setEndValue(0.0)
+            self.offset = start
+            self.scroll_animation.start()
+        else:
+            self.scroll_animation.stop()
+            self.offset = 0.0
+
+        self.lines = lines
+        self.update()
+
+    def replay_scroll(self):
+        # the lines scroll in again, as if the current line had just started
+        lines = self.lines
+        self.set_lines([""] + lines[:-1])
+        self.set_lines(lines, scroll=True)
+
+    def copy_current_line(self):
+        if self.lines[self.CURRENT_LINE]:
+            QApplication.clipboard().setText(self.lines[self.CURRENT_LINE])
+
+    def line_at(self, position):
+        for index, rect in self.line_rects:
+            if rect.contains(QPointF(position)):
+                return self.lines[index]
+        return self.lines[self.CURRENT_LINE]
+
+    def contextMenuEvent(self, event):
+        line = self.line_at(event.pos())
+        shown = "\n".join(text for text in self.lines if text)
+
+        menu = QMenu(self)
+        copy_line = menu.addAction("Copy Line")
+        copy_line.setEnabled(bool(line))
+        copy_shown = menu.addAction("Copy Shown Lyrics")
+        copy_shown.setEnabled(bool(shown))
+
+        chosen = menu.exec(event.globalPos())
+        if chosen is copy_line:
+            QApplication.clipboard().setText(line)
+        elif chosen is copy_shown:
+            QApplication.clipboard().setText(shown)
+
+    def on_scroll(self, offset):
+        self.offset = offset
+        self.update()
+
+    def line_spacing(self):
+        return self.get_font.font_size * 0.6
+
+    def line_height(self, text, width):
+        return self.line_path(text, width)[1] if text else 0.0
+
+    def set_message(self, text):
+        """Show a single line in the middle, e.g. when lyrics are disabled."""
+        lines = [""] * self.LINE_COUNT
+        lines[self.CURRENT_LINE] = text
+        self.set_lines(lines)
+
+    def set_lyrics_color(self, color):
+        self.lyrics_color = QColor(color)
+        self.update()
+
+    def line_path(self, text, width):
+        key = (text, self.get_font.fonts_key, width)
+        cached = self.paths.get(key)
+        if cached is not None:
+            self.paths.move_to_end(key)
+            return cached
+
+        cached = self.build_path(text, width)
+        self.paths[key] = cached
+        if len(self.paths) > self.PATH_CACHE_SIZE:
+            self.paths.popitem(last=False)
+        return cached
+
+    def build_path(self, text, width):
+        # split the font runs into words and wrap them greedily, each row centered
+        rows = [[]]  # per row: (font, piece, advance)
+        row_width = 0.0
+        line_height = 0.0
+
+        for font, run in self.get_font.font_runs(text):
+            metrics = QFontMetricsF(font)
+            line_height = max(line_height, metrics.height())
+            for piece in WORD_BREAKS.split(run):
+                if not piece:
+                    continue
+                if piece.isspace() and "\n" in piece:
+                    # unsynced lyrics come as one line holding all of them, their line breaks are kept
+                    for _ in range(piece.count("\n")):
+                        rows.append([])
+                    row_width = 0.0
+                    continue
+                advance = metrics.horizontalAdvance(piece)
+                if row_width + advance > width and rows[-1]:
+                    if piece.isspace():
+                        continue  # no spaces at the start of a row
+                    rows.append([])
+                    row_width = 0.0
+                rows[-1].append((font, piece, advance))
+                row_width += advance
+
+        path = QPainterPath()
+        y = 0.0
+        for row in rows:
+            if not row:
+                y += line_height  # an empty line between verses
+                continue
+            x = (width - sum(advance for _, _, advance in row)) / 2
+            ascent = max(QFontMetricsF(font).ascent() for font, _, _ in row)
+            for font, piece, advance in row:
+                path.addText(QPointF(x, y + ascent), font, piece)
+                x += advance
+            y += line_height
+
+        return path, y
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        width = self.width() - 40
+        outline = QPen(self.outline_color, max(2.0, self.get_font.font_size / 14), Qt.PenStyle.SolidLine,
+                       Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin)
+        spacing = self.line_spacing()
+
+        layouts = [self.line_path(line, width) if line else (None, 0.0) for line in self.lines]
+        current_path, current_height = layouts[self.CURRENT_LINE]
+
+        # the current line in the middle, the others stacked above and below it
+        tops = [0.0] * self.LINE_COUNT
+        tops[self.CURRENT_LINE] = (self.height() - current_height) / 2 + self.offset
+        for index in range(self.CURRENT_LINE - 1, -1, -1):
+            tops[index] = tops[index + 1] - spacing - layouts[index][1]
+        for index in range(self.CURRENT_LINE + 1, self.LINE_COUNT):
+            tops[index] = tops[index - 1] + layouts[index - 1][1] + spacing
+
+        visible = QRectF(self.rect())
+        self.line_rects = []
+        for index, (path, height) in enumerate(layouts):
+            rect = QRectF(0, tops[index], self.width(), height)
+            if path is None or not visible.intersects(rect):
+                continue
+            self.line_rects.append((index, rect))
+            painter.save()
+            painter.translate(20, tops[index])
+            painter.strokePath(path, outline)
+            painter.fillPath(path, self.lyrics_color if index == self.CURRENT_LINE else self.other_color)
+            painter.restore()
+
+        painter.end()
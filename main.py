@@ -1,4 +1,7 @@
-from musicplayerui import MusicPlayerUI
+from startuptrace import startup_tracer
+
+with startup_tracer.phase("imports"):
+    from musicplayerui import MusicPlayerUI
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import QSharedMemory
 from PyQt6.QtNetwork import QLocalServer, QLocalSocket
@@ -89,8 +92,13 @@ class SingleInstanceApp:
         cleanup_stale_server()
 
         # If no other instance is running, create the UI and the local server
-        ui = MusicPlayerUI(app)
-        ui.createUI()
+        with startup_tracer.phase("config"):
+            ui = MusicPlayerUI(app)
+        with startup_tracer.phase("createUI"):
+            ui.createUI()
+
+        # the trace ends when the main window has been painted for the first time
+        startup_tracer.finish_on_first_paint(app, ui, os.path.join(ui.config_path, "startup_trace.json"))
 
         # Set up the local server for future instances to communicate with
         self.create_local_server(ui)
@@ -1,30 +1,71 @@
 from PyQt6.QtGui import QIcon
 import os
+import time
 from PyQt6.QtCore import QThread, QObject, pyqtSignal
 from easy_json import EasyJson
-from musicplayerworker import MusicPlayerWorker
+from musicplayerworker import MusicPlayerWorker, PlayerState
+from playbackclock import PlaybackClock
+
+
+class MusicPlayer(QObject):
+    # Commands for the worker thread. They are queued, so the gui never waits on the media backend.
+    # Every command carries the time.perf_counter_ns() it was posted at, for the worker's latency histograms.
+    playRequested = pyqtSignal('qint64')
+    pauseRequested = pyqtSignal('qint64')
+    stopRequested = pyqtSignal('qint64')
+    seekRequested = pyqtSignal('qint64', 'qint64')
+    loadRequested = pyqtSignal(str, 'qint64')
+    preloadRequested = pyqtSignal(str, 'qint64')
+    clearPreloadRequested = pyqtSignal('qint64')
+    positionUpdatesRequested = pyqtSignal(bool, 'qint64')
 
-
-class MusicPlayer:
     def __init__(self, parent, play_pause_button, loop_playlist_button, repeat_button, shuffle_button,
-                 playNextSong=None, playRandomSong=None):
+                 playNextSong=None, playRandomSong=None, getNextSongFile=None):
+        super().__init__()
         self.parent = parent
         self.ej = EasyJson()
         self.playNextSong = playNextSong
         self.playRandomSong = playRandomSong
+        self.getNextSongFile = getNextSongFile
         self.file_name = None
         self.eop_text = "End Of Playlist"
-        self.player = MusicPlayerWorker(self.handle_media_status_changed)  # Create a worker instance
+        self.gapless_handoff = False  # True when the current file was started by the gapless handoff
+        self.preload_requested = False  # the worker may hold the next track on its standby player
+
+        # The latest snapshot published by the worker, queries are answered from it instead of cross-thread calls
+        self.state = PlayerState(file=None, position=0, duration=0, playing=False, media_status=None, handoff=False)
 
+        # Ui position consumers subscribe to the clock instead of the worker's position ticks
+        self.clock = PlaybackClock()
+        self.clock.activeChanged.connect(self.request_position_updates)
+
+        self.player = MusicPlayerWorker()  # Create a worker instance
         self.thread = QThread()  # Create a QThread
 
         # Move the worker to the thread
         self.player.moveToThread(self.thread)
 
         # Connect signals and slots
-        self.thread.started.connect(self.player.play)  # When the thread starts, the worker will play the song
+        self.thread.started.connect(self.player.setup)  # The media players are created inside the worker thread
+        self.thread.finished.connect(self.player.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)  # Clean up when the thread is finished
 
+        self.playRequested.connect(self.player.play)
+        self.pauseRequested.connect(self.player.pause)
+        self.stopRequested.connect(self.player.stop)
+        self.seekRequested.connect(self.player.seek)
+        self.loadRequested.connect(self.player.load)
+        self.preloadRequested.connect(self.player.preload)
+        self.clearPreloadRequested.connect(self.player.clear_preload)
+        self.positionUpdatesRequested.connect(self.player.set_position_updates)
+
+        self.player.stateChanged.connect(self.update_state)
+        self.player.positionChanged.connect(self.update_position)
+        self.player.mediaStatusChanged.connect(self.handle_media_status_changed)
+        self.player.aboutToFinish.connect(self.preload_next_song)
+
+        self.thread.start()
+
         self.started_playing = False
         self.in_pause_state = False
         self.music_on_repeat = None
@@ -40,11 +81,40 @@ class MusicPlayer:
         self.shuffle_button = shuffle_button
         self.script_path = os.path.dirname(os.path.abspath(__file__))
 
+    def update_state(self, state):
+        self.state = state
+        self.clock.sync(state.position, state.playing, state.duration)
+
+    def update_position(self, position):
+        self.clock.sync(position)
+
+    def request_position_updates(self, enabled):
+        # with no position subscribers left only end of media handling runs, which needs no ticks
+        self.positionUpdatesRequested.emit(enabled, time.perf_counter_ns())
+
     def play(self):
         self.started_playing = True
-        self.update_music_file(self.file_name)
-        self.thread.start()  # Start the thread to play the song in the background
-        self.player.play()
+        self.playRequested.emit(time.perf_counter_ns())
+
+    def stop(self):
+        self.parent.resume_positions.save()
+        self.stopRequested.emit(time.perf_counter_ns())
+
+    def set_position(self, position):
+        position = max(int(position), 0)
+        self.clock.jump(position)  # answer position queries with the target until the worker confirms it
+        self.seekRequested.emit(position, time.perf_counter_ns())
+        self.parent.resume_positions.checkpoint()  # written with the next flush, seeks can come in quick succession
+
+    def is_playing(self):
+        return self.state.playing
+
+    def latency_report(self):
+        return self.player.latency_report()
+
+    def shutdown(self):
+        self.thread.quit()
+        self.thread.wait(1000)
 
     def save_playback_control_state(self):
         self.ej.edit_value("previous_loop", self.previous_loop_state)
@@ -53,9 +123,19 @@ class MusicPlayer:
         self.ej.edit_value("loop", self.playlist_on_loop)
         self.ej.edit_value("repeat", self.music_on_repeat)
 
+    def journal_modes(self):
+        # the config only gets these on a clean exit, the session journal keeps them through a crash
+        self.parent.session_journal.set_modes({
+            "shuffle": self.music_on_shuffle,
+            "repeat": self.music_on_repeat,
+            "loop": self.playlist_on_loop,
+            "previous_loop": self.previous_loop_state,
+            "previous_shuffle": self.previous_shuffle_state,
+        })
+
     def setup_playback_control_state(self):
         self.previous_loop_state = self.ej.get_value("previous_loop")
-        self.previous_shuffle_state = self.ej.get_value("previous__shuffle")
+        self.previous_shuffle_state = self.ej.get_value("previous_shuffle")
         self.music_on_repeat = self.ej.get_value("repeat")
         self.music_on_shuffle = self.ej.get_value("shuffle")
         self.playlist_on_loop = self.ej.get_value("loop")
@@ -89,6 +169,9 @@ class MusicPlayer:
             self.loop_playlist_button.setToolTip("On Playlist Looping")
             self.playlist_on_loop = True
 
+        self.invalidate_preload()
+        self.journal_modes()
+
     def toggle_repeat(self):
         if self.music_on_repeat:
             self.repeat_button.setIcon(QIcon(os.path.join(self.script_path, "media-icons", "repeat.ico")))
@@ -101,6 +184,8 @@ class MusicPlayer:
 
         self.disable_shuffle()
         self.disable_loop_playlist()
+        self.invalidate_preload()
+        self.journal_modes()
 
     def toggle_shuffle(self):
         if self.music_on_shuffle:
@@ -114,6 +199,8 @@ class MusicPlayer:
             self.parent.prepare_for_random()
 
         self.disable_loop_playlist()
+        self.invalidate_preload()
+        self.journal_modes()
 
     def disable_loop_playlist(self, no_setup=True):
         if self.music_on_repeat or self.music_on_shuffle:
@@ -154,60 +241,90 @@ class MusicPlayer:
 
     def update_music_file(self, file):
         self.file_name = file
-        self.player.setSource(self.file_name)
+        if self.state.handoff and file == self.state.file:
+            # the worker already started this file when the previous one ended
+            self.gapless_handoff = True
+            self.state = self.state._replace(handoff=False)
+            return
+
+        self.gapless_handoff = False
+        self.preload_requested = False  # loading another file drops the worker's preload
+        self.loadRequested.emit(file, time.perf_counter_ns())
+
+    def preload_next_song(self):
+        # repeating restarts the same file, so there is nothing to preload
+        if self.music_on_repeat or self.getNextSongFile is None:
+            return
+        next_file = self.getNextSongFile()
+        if next_file:
+            self.preload_requested = True
+            self.preloadRequested.emit(next_file, time.perf_counter_ns())
+
+    def invalidate_preload(self):
+        """The next song has changed: drop the preloaded one, and preload the new one if the end is already near."""
+        if not self.preload_requested:
+            return
+        self.preload_requested = False
+        self.clearPreloadRequested.emit(time.perf_counter_ns())
+
+        remaining = self.clock.duration - self.clock.position()
+        if self.clock.playing and 0 < remaining <= self.player.PRELOAD_WINDOW:
+            self.preload_next_song()  # the worker only announces the end of a track once
 
     def play_pause_music(self):
         if self.started_playing:  # pause state activating
             if not self.in_pause_state:
                 # Record the current position before pausing
-                self.paused_position = self.player.position()  # Assuming get_position() returns
-                # the current position in seconds or milliseconds
+                self.paused_position = self.get_position()
 
-                self.player.pause()
+                self.pauseRequested.emit(time.perf_counter_ns())
+                self.parent.resume_positions.save()
                 self.in_pause_state = True
                 self.play_pause_button.setIcon(QIcon(os.path.join(self.script_path, "media-icons", "play.ico")))
             else:
                 # Set the position to the recorded value before resuming
-                self.player.setPosition(self.paused_position)  # Assuming set_position() sets the playback position
+                self.set_position(self.paused_position)
 
                 # Continue playing
-                self.player.play()
+                self.playRequested.emit(time.perf_counter_ns())
                 self.in_pause_state = False
                 self.play_pause_button.setIcon(QIcon(os.path.join(self.script_path, "media-icons", "pause.ico")))
 
     def pause(self):
-        self.paused_position = self.player.position()  # Assuming get_position()
-        # returns the current position in seconds or milliseconds
+        self.paused_position = self.get_position()
         self.in_pause_state = True
         self.play_pause_button.setIcon(QIcon(os.path.join(self.script_path, "media-icons", "play.ico")))
-        self.player.pause()
+        self.pauseRequested.emit(time.perf_counter_ns())
+        self.parent.resume_positions.save()
 
     def get_current_time(self):
-        position = self.player.position() / 1000.0
+        position = self.get_position() / 1000.0
         return position
 
     def seek_forward(self, saved_position=None):
-        if self.player.isPlaying and not saved_position:
-            self.player.setPosition(self.player.position() + 1000)
+        if not saved_position:
+            self.set_position(self.get_position() + 1000)
         else:
-            self.player.setPosition(saved_position)
+            self.set_position(saved_position)
 
     def seek_backward(self):
-        if self.player.isPlaying:
-            self.player.setPosition(self.player.position() - 1000)
+        self.set_position(self.get_position() - 1000)
 
     def get_duration(self):
-        return self.player.duration()
+        return self.state.duration
 
     def get_position(self):
-        return self.player.position()
+        return self.clock.position()
 
     def handle_media_status_changed(self, status):
         if status == self.player.MediaStatus.EndOfMedia:
             if self.music_on_repeat:
+                if self.state.handoff:
+                    # repeat was turned on right at the end, after the next track had already taken over
+                    self.loadRequested.emit(self.file_name, time.perf_counter_ns())
                 # Restart playback
-                self.player.setPosition(0)
-                self.player.play()
+                self.set_position(0)
+                self.play()
             else:
                 if self.music_on_shuffle:
                     self.playRandomSong()
@@ -3,21 +3,14 @@ from base64 import b64decode
 import os
 import sys
 import platform
-from PyQt6.QtGui import QAction, QIcon, QFont, QFontDatabase, QAction, QCursor, QKeyEvent, QActionGroup, QColor, \
+from functools import cached_property
+from PyQt6.QtGui import QAction, QIcon, QFont, QAction, QCursor, QKeyEvent, QActionGroup, QColor, \
     QPainter, QPixmap, QPainterPath, QTextDocument
 from PyQt6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QHeaderView, QMessageBox, QSystemTrayIcon, QMenu, QWidgetAction,
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QHeaderView, QMessageBox, QSystemTrayIcon, QMenu,
     QLabel, QPushButton, QSlider, QLineEdit, QTableWidget, QFileDialog, QScrollArea, QSizePolicy,
 )
 from PyQt6.QtCore import Qt, QCoreApplication, QRectF
-from mutagen import File
-from mutagen.flac import FLAC, Picture
-from mutagen.id3 import APIC
-from mutagen.id3 import ID3, ID3NoHeaderError
-from mutagen.oggvorbis import OggVorbis
-from mutagen.mp3 import MP3
-from mutagen.mp4 import MP4
-from mutagen.wave import WAVE
 from album_image_window import AlbumImageWindow
 from lrcsync import LRCSync
 from musicplayer import MusicPlayer
@@ -27,8 +20,12 @@ from songtablewidget import SongTableWidget
 from albumtreewidget import AlbumTreeWidget
 from random import choice, shuffle
 from fontsettingdialog import FontSettingsWindow
-from tag_dialog import TagDialog
 from addnewdirectory import AddNewDirectory
+from readahead import ReadAheadCache
+from fontregistry import font_registry
+from startuptrace import startup_tracer
+from resumepositions import ResumePositions
+from sessionjournal import SessionJournal, QUEUE_ADD, QUEUE_ALBUM_TITLE, QUEUE_REMOVE, MODES, decode_modes
 
 
 def html_to_plain_text(html):
@@ -39,6 +36,8 @@ def html_to_plain_text(html):
 
 def extract_mp3_album_art(audio_file):
     """Extract album art from an MP3 file."""
+    from mutagen.id3 import APIC
+
     if audio_file.tags is None:
         return None
 
@@ -66,6 +65,7 @@ def extract_flac_album_art(audio_file):
 def extract_ogg_album_art(audio_file):
     """Extract album art from an OGG file."""
     if 'metadata_block_picture' in audio_file:
+        from mutagen.flac import Picture
         picture_data = audio_file['metadata_block_picture'][0]
         picture = Picture(b64decode(picture_data))
         return picture.data
@@ -121,26 +121,28 @@ def getRoundedCornerPixmap(scaled_pixmap, target_width, target_height):
 
 
 class MusicPlayerUI(QMainWindow):
+    SLIDER_RATE = 10  # slider updates per second requested from the playback clock
+    PROGRESS_LABEL_RATE = 4  # the label shows whole seconds, a few checks per second keep it on time
+
     def __init__(self, app):
         super().__init__()
 
         # Define the config path
         self.play_song_at_startup = None
-        self.threshold_actions = None
         self.search_bar_layout = None
         self.script_path = os.path.dirname(os.path.abspath(__file__))
-        QFontDatabase.addApplicationFont(os.path.join(self.script_path, "fonts/KOMIKAX_.ttf"))
+        font_registry.register(os.path.join(self.script_path, "fonts/KOMIKAX_.ttf"))
 
         self.slider_layout = None
         self.duration_label = None
+        self.total_time_text = format_time(0)
+        self.shown_progress_seconds = None
         self.passing_image = None
         self.next_song_button = None
         self.prev_song_button = None
         self.playback_management_layout = None
         self.albumTreeWidget = None
-        self.addnewdirectory = AddNewDirectory(self)
         self.color_actions = None
-        self.font_settings_window = None
         self.font_settings_action = None
         self.show_lyrics_action = None
         self.tray_menu = None
@@ -200,18 +202,37 @@ class MusicPlayerUI(QMainWindow):
 
         self.directories = self.ej.get_value("music_directories")
 
+        # keeps the next songs of the queue in the page cache for slow or network disks
+        self.readahead = ReadAheadCache(int(self.ej.get_value("readahead_budget_mb")) * 1024 * 1024,
+                                        int(self.ej.get_value("readahead_tracks")))
+
         self.music_file = None
         self.lrc_file = None
         self.music_player = MusicPlayer(self, self.play_pause_button, self.loop_playlist_button, self.repeat_button,
-                                        self.shuffle_button, self.play_next_song, self.play_random_song)
+                                        self.shuffle_button, self.play_next_song, self.play_random_song,
+                                        self.get_next_song_file)
 
         self.lrcPlayer = LRCSync(self, self.music_player, self.config_path, self.on_off_lyrics, self.showMaximized)
 
+        # where every track was left, checkpointed from the playback clock
+        self.resume_positions = ResumePositions(self.config_path, self.music_player.clock)
+
+        # playlist and modes since the last clean exit, replayed after a crash
+        self.session_journal = SessionJournal(self.config_path)
+
     @staticmethod
     def get_metadata(song_file: object):
         if song_file is None:
             return
 
+        # mutagen is imported the first time a song is read rather than at startup
+        from mutagen.flac import FLAC
+        from mutagen.id3 import ID3
+        from mutagen.oggvorbis import OggVorbis
+        from mutagen.mp3 import MP3
+        from mutagen.mp4 import MP4
+        from mutagen.wave import WAVE
+
         file_extension = song_file.lower().split('.')[-1]
 
         metadata = {
@@ -320,11 +341,14 @@ class MusicPlayerUI(QMainWindow):
         else:
             return
 
+        last_played = self.resume_positions.last_played()
         last_play_file_data = self.ej.get_value("last_played_song")
-        if last_play_file_data:
-            for file, position in last_play_file_data.items():
-                self.music_file = file
-                self.saved_position = position
+        if last_played is None and last_play_file_data:
+            # saved by older versions, in seconds
+            last_played = [(file, int(position * 1000), 0) for file, position in last_play_file_data.items()][-1]
+
+        if last_played:
+            self.music_file, self.saved_position = last_played[0], last_played[1]
 
             last_played_items = self.songTableWidget.findItems(self.music_file, Qt.MatchFlag.MatchExactly)
             item = None
@@ -349,9 +373,12 @@ class MusicPlayerUI(QMainWindow):
         self.icon_path = os.path.join(self.script_path, 'icons', 'april-icon.png')
 
         self.setWindowIcon(QIcon(self.icon_path))
-        self.createMenuBar()
-        self.createWidgetAndLayouts()
-        self.showMaximized()
+        with startup_tracer.phase("menu bar"):
+            self.createMenuBar()
+        with startup_tracer.phase("widgets and layouts"):
+            self.createWidgetAndLayouts()
+        with startup_tracer.phase("show"):
+            self.showMaximized()
         self.setupTrayIcon()
 
     def setupTrayIcon(self):
@@ -384,11 +411,26 @@ class MusicPlayerUI(QMainWindow):
 
     def closeEvent(self, event):
         print("hiding window")
+        if self.lrcPlayer.is_display_visible():
+            self.lrcPlayer.lrc_display.close()  # closing it brings the main window back, so hide afterwards
         self.hide()
-        if self.lrcPlayer.lrc_display is not None:
-            self.lrcPlayer.lrc_display.close()
         event.ignore()
 
+    def showEvent(self, event):
+        # resume the main window's position work, every subscriber starts from the current position
+        if self.slider is not None:
+            self.music_player.clock.subscribe(self.update_slider, self.SLIDER_RATE)
+            self.music_player.clock.subscribe(self.update_progress_label, self.PROGRESS_LABEL_RATE)
+            self.lrcPlayer.set_media_lyric_shown(True)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        # hidden in the tray, minimized or behind the lrc display: only end of track handling keeps running
+        self.music_player.clock.unsubscribe(self.update_slider)
+        self.music_player.clock.unsubscribe(self.update_progress_label)
+        self.lrcPlayer.set_media_lyric_shown(False)
+        super().hideEvent(event)
+
     def keyPressEvent(self, event: QKeyEvent):
         if event.key() == Qt.Key.Key_I and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
             print("disabled lyrics")
@@ -464,7 +506,16 @@ class MusicPlayerUI(QMainWindow):
 
     def exit_app(self):
         self.songTableWidget.save_table_data()
+        self.session_journal.close()
         self.music_player.save_playback_control_state()
+        self.resume_positions.shutdown()
+        print(f"Read-ahead cache statistics: {self.readahead.stats()}")
+        print(f"Lyrics cache statistics: {self.lrcPlayer.lyrics_cache.stats()}")
+        print(f"Player command latencies:\n{self.music_player.latency_report()}")
+        self.music_player.shutdown()
+        self.lrcPlayer.lyrics_executor.shutdown(wait=False, cancel_futures=True)
+        self.albumTreeWidget.stop_extracting_lyrics()
+        self.ej.flush()  # pending config edits
         sys.exit()
 
     def toggle_add_directories(self):
@@ -472,7 +523,8 @@ class MusicPlayerUI(QMainWindow):
 
     def set_default_background_image(self):
         self.ej.setupBackgroundImage()
-        self.lrcPlayer.resizeBackgroundImage(self.ej.get_value("background_image"))
+        self.ej.edit_value("background_folder", "")
+        self.lrcPlayer.set_background_image(self.ej.get_value("background_image"))
         QMessageBox.about(self, "Default Background Image", "Default lyric background image is restored")
 
     def on_off_lyrics(self, checked):
@@ -487,22 +539,30 @@ class MusicPlayerUI(QMainWindow):
                 return
 
             self.lrcPlayer.media_lyric.setText(
-                self.lrcPlayer.media_font.get_formatted_text(self.lrcPlayer.lyric_label3_text))
+                self.lrcPlayer.media_font.get_formatted_text(self.lrcPlayer.current_lyric_text))
 
         else:
             print("in disabling")
             self.ej.edit_value("show_lyrics", False)
             self.lrcPlayer.show_lyrics = False
             self.show_lyrics_action.setChecked(False)
-            if self.lrcPlayer.media_sync_connected:
-                self.music_player.player.positionChanged.disconnect(self.lrcPlayer.update_media_lyric)
-                self.lrcPlayer.media_sync_connected = False
+            self.lrcPlayer.disconnect_media_lyric()
             self.lrcPlayer.media_lyric.setText(self.lrcPlayer.media_font.get_formatted_text("Lyrics Disabled"))
             self.lrcPlayer.current_index = 0
 
     def toggle_on_off_lyrics(self, checked):
         self.on_off_lyrics(checked)
 
+    # Secondary dialogs are only built the first time they are opened, not at startup
+
+    @cached_property
+    def addnewdirectory(self):
+        return AddNewDirectory(self)
+
+    @cached_property
+    def font_settings_window(self):
+        return FontSettingsWindow(self)
+
     def show_font_settings(self):
         self.font_settings_window.exec()
 
@@ -539,6 +599,9 @@ class MusicPlayerUI(QMainWindow):
         add_lrc_background = QAction("Add Lrc Background Image", self)
         add_lrc_background.triggered.connect(self.ask_for_background_image)
 
+        add_lrc_background_folder = QAction("Add Lrc Background Folder (Slideshow)", self)
+        add_lrc_background_folder.triggered.connect(self.ask_for_background_folder)
+
         set_default_background = QAction("Set Default Background Image", self)
         set_default_background.triggered.connect(self.set_default_background_image)
 
@@ -551,8 +614,6 @@ class MusicPlayerUI(QMainWindow):
         self.font_settings_action = QAction("Font Settings", self)
         self.font_settings_action.triggered.connect(self.show_font_settings)
 
-        self.font_settings_window = FontSettingsWindow(self)
-
         # Play song at startup action
         self.play_song_at_startup = QAction("Play Song at startup", self)
         self.play_song_at_startup.setCheckable(True)
@@ -568,9 +629,25 @@ class MusicPlayerUI(QMainWindow):
         settings_menu.addAction(self.show_lyrics_action)
         settings_menu.addAction(self.font_settings_action)
 
-        # Add a sub-menu for text color selection with radio buttons
+        # Add a sub-menu for text color selection with radio buttons, filled the first time it opens
         text_color_menu = QMenu("Choose Lyrics Color", self)
         settings_menu.addMenu(text_color_menu)
+        text_color_menu.aboutToShow.connect(lambda: self.populate_color_menu(text_color_menu))
+
+        # Linking actions and menus
+        file_menu.addAction(reload_directories_action)
+        file_menu.addAction(add_directories_action)
+        file_menu.addAction(close_action)
+        help_menu.addAction(fromMe)
+        help_menu.addAction(preparation_tips)
+        help_menu.addAction(show_shortcuts_action)
+        settings_menu.addAction(add_lrc_background)
+        settings_menu.addAction(add_lrc_background_folder)
+        settings_menu.addAction(set_default_background)
+
+    def populate_color_menu(self, text_color_menu):
+        if self.color_actions is not None:
+            return  # the swatches are drawn only once
 
         # Create an action group to enforce a single selection (radio button behavior)
         color_group = QActionGroup(self)
@@ -605,47 +682,8 @@ class MusicPlayerUI(QMainWindow):
             text_color_menu.addAction(action)
             self.color_actions[COLOR] = action
 
-        self.color_actions[self.ej.get_value("lyrics_color")].setChecked(True)
-
-        # Add a sub-menu for sync threshold selection with radio buttons
-        sync_threshold_menu = QMenu("Choose Syncing Interval", self)
-        settings_menu.addMenu(sync_threshold_menu)
-
-        # Add a QLabel at the top of the menu with your message
-        label = QLabel(
-            "This is basically the refresh rate. Shorter interval provides \nsmoother syncing but uses more CPU.", self)
-        label_action = QWidgetAction(self)
-        label_action.setDefaultWidget(label)
-
-        # Create an action group to enforce a single selection (radio button behavior)
-        threshold_group = QActionGroup(self)
-        threshold_group.setExclusive(True)
-
-        # Define threshold options in seconds
-        thresholds = [0.1, 0.2, 0.3, 0.5, 0.7, 1.0]
-        self.threshold_actions = {}
-        for THRESHOLD in thresholds:
-            action = QAction(f"{THRESHOLD} seconds", self)
-            action.setCheckable(True)
-            action.setActionGroup(threshold_group)
-            action.triggered.connect(self.set_sync_threshold)  # Connect to method
-            sync_threshold_menu.addAction(action)
-            self.threshold_actions[THRESHOLD] = action
-
-        sync_threshold_menu.addAction(label_action)
-
-        # Set the previously selected threshold
-        self.threshold_actions[self.ej.get_value("sync_threshold")].setChecked(True)
-
-        # Linking actions and menus
-        file_menu.addAction(reload_directories_action)
-        file_menu.addAction(add_directories_action)
-        file_menu.addAction(close_action)
-        help_menu.addAction(fromMe)
-        help_menu.addAction(preparation_tips)
-        help_menu.addAction(show_shortcuts_action)
-        settings_menu.addAction(add_lrc_background)
-        settings_menu.addAction(set_default_background)
+        if self.ej.get_value("lyrics_color") in self.color_actions:
+            self.color_actions[self.ej.get_value("lyrics_color")].setChecked(True)
 
     def get_selected_color(self):
         selected_color = self.ej.get_value("lyrics_color")
@@ -654,18 +692,7 @@ class MusicPlayerUI(QMainWindow):
                 selected_color = color
                 break
         print(f"Selected color: {selected_color}")
-        self.ej.edit_value("lyrics_color", selected_color.lower())
-
-    # Method to update sync threshold
-    def set_sync_threshold(self):
-        selected_threshold = self.ej.get_value("sync_threshold")
-        for threshold, action in self.threshold_actions.items():
-            if action.isChecked():
-                selected_threshold = threshold
-                break
-        print(f"Selected Threshold: {selected_threshold}")
-        self.ej.edit_value("sync_threshold", selected_threshold)
-        self.lrcPlayer.update_interval = selected_threshold
+        self.ej.edit_value("lyrics_color", selected_color.lower())  # the lrc display follows the config
 
     def show_fromMe(self):
         text = """<b>This project was developed to "the version 1 released" solely by me. I wish I could get 
@@ -713,12 +740,24 @@ class MusicPlayerUI(QMainWindow):
 
         if file_path:
             self.ej.edit_value("background_image", file_path)
-            self.lrcPlayer.resizeBackgroundImage(self.ej.get_value("background_image"))
+            self.ej.edit_value("background_folder", "")
+            self.lrcPlayer.set_background_image(self.ej.get_value("background_image"))
             # Show the selected file path in a QMessageBox
             QMessageBox.information(self, "Load Background Image", f"You selected: {file_path}")
         else:
             QMessageBox.warning(self, "No File Selected", "You did not select any file.")
 
+    def ask_for_background_folder(self):
+        # The lrc display cycles through the images of this folder
+        folder = QFileDialog.getExistingDirectory(self, "Select a folder of images for the lrc display background")
+
+        if folder:
+            self.ej.edit_value("background_folder", folder)
+            self.lrcPlayer.set_background_folder(folder)
+            QMessageBox.information(self, "Load Background Folder", f"You selected: {folder}")
+        else:
+            QMessageBox.warning(self, "No Folder Selected", "You did not select any folder.")
+
     def show_context_menu(self, pos):
         # Get the item at the clicked position
         item = self.songTableWidget.itemAt(pos)
@@ -749,10 +788,42 @@ class MusicPlayerUI(QMainWindow):
     def activate_file_tagger(self):
         currentRow = self.songTableWidget.currentRow()
         music_file = self.songTableWidget.item(currentRow, 7).text()
+        from tag_dialog import TagDialog  # brings in mutagen's tag writers
         tagger = TagDialog(self, music_file, self.songTableWidget, self.albumTreeWidget, self.albumTreeWidget.cursor,
                            self.albumTreeWidget.conn)
         tagger.exec()
 
+    def recover_session(self):
+        # apply what the session journal holds on top of the saved playlist and config
+        journal = self.session_journal
+        records = journal.replay()
+        queue_changed = False
+
+        journal.replaying = True
+        for kind, file_path, value in records:
+            if kind == QUEUE_ADD and file_path:
+                self.albumTreeWidget.add_song_by_file_path(file_path)
+                queue_changed = True
+            elif kind == QUEUE_ALBUM_TITLE and file_path:
+                if file_path not in self.songTableWidget.files_on_playlist:  # not in the saved playlist yet
+                    self.albumTreeWidget.cursor.execute('SELECT album FROM songs WHERE file_path=?', (file_path,))
+                    album = self.albumTreeWidget.cursor.fetchone()
+                    if album:
+                        self.albumTreeWidget.add_album_title_row(album[0])
+                        queue_changed = True
+            elif kind == QUEUE_REMOVE and file_path:
+                self.songTableWidget.remove_song_row(file_path)
+                queue_changed = True
+            elif kind == MODES:
+                for key, on in decode_modes(value).items():
+                    self.ej.edit_value(key, on)
+        journal.replaying = False
+
+        journal.snapshot = self.songTableWidget.save_table_data
+        if queue_changed:
+            print(f"Recovered {len(records)} session journal records")
+            journal.compact()
+
     def createWidgetAndLayouts(self):
         """ The main layout of the music player ui"""
         self.central_widget = QWidget(self)
@@ -762,9 +833,10 @@ class MusicPlayerUI(QMainWindow):
         self.central_widget.setLayout(main_layout)
 
         # Initialize the table widget
-        self.songTableWidget = SongTableWidget(self, self.handleRowDoubleClick, self.music_player.seek_forward,
-                                               self.music_player.seek_backward, self.play_pause, self.config_path,
-                                               self.screen_size.height())
+        with startup_tracer.phase("table load"):
+            self.songTableWidget = SongTableWidget(self, self.handleRowDoubleClick, self.music_player.seek_forward,
+                                                   self.music_player.seek_backward, self.play_pause, self.config_path,
+                                                   self.screen_size.height())
 
         self.songTableWidget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.songTableWidget.customContextMenuRequested.connect(self.show_context_menu)
@@ -788,7 +860,11 @@ class MusicPlayerUI(QMainWindow):
 
         song_collection_layout = QVBoxLayout()
         self.albumTreeWidget = AlbumTreeWidget(self, self.songTableWidget)
-        self.albumTreeWidget.loadSongsToCollection(self.directories)
+        self.lrcPlayer.lyrics_cache.embedded_loader = self.albumTreeWidget.get_embedded_lyrics
+        with startup_tracer.phase("collection load"):
+            self.albumTreeWidget.loadSongsToCollection(self.directories)
+        with startup_tracer.phase("session recovery"):
+            self.recover_session()
         song_collection_layout.addWidget(self.albumTreeWidget)
 
         playlistLayout = QVBoxLayout()
@@ -898,25 +974,27 @@ class MusicPlayerUI(QMainWindow):
             self.play_pause()
 
     def update_slider(self, position):
-        self.update_progress_label(self.music_player.player.position())
         self.slider.setValue(position)
 
     def update_slider_range(self, duration):
         self.slider.setRange(0, duration)
+        self.total_time_text = format_time(duration // 1000)  # Total duration in seconds
+        self.shown_progress_seconds = None
 
     def activate_lrc_display(self):
         self.hide()
-        if self.lrcPlayer.lrc_display is not None:
+        if self.lrcPlayer.is_display_visible():
             pass
         else:
             self.lrcPlayer.startUI(self, self.lrc_file)
 
     def update_progress_label(self, position):
-        # Calculate current time and total time
-        current_time = format_time(position // 1000)  # Convert from ms to seconds
-        total_time = format_time(self.music_player.get_duration() // 1000)  # Total duration in seconds
+        seconds = position // 1000  # Convert from ms to seconds
+        if seconds == self.shown_progress_seconds:
+            return  # the label only shows whole seconds
+        self.shown_progress_seconds = seconds
 
-        duration_string = f"[{current_time}/{total_time}]"
+        duration_string = f"[{format_time(seconds)}/{self.total_time_text}]"
         self.duration_label.setText(duration_string)
 
     def setupMediaPlayerControlsPanel(self, right_layout):
@@ -932,8 +1010,7 @@ class MusicPlayerUI(QMainWindow):
         self.slider.setRange(0, self.music_player.get_duration())
         self.slider.setValue(0)
 
-        # Connect the slider to the player's position
-        self.music_player.player.positionChanged.connect(self.update_slider)
+        # The slider and the progress label follow the playback clock while the window is shown, see showEvent
         self.music_player.player.durationChanged.connect(self.update_slider_range)
         self.slider.sliderMoved.connect(self.update_player_from_slider)
 
@@ -1068,7 +1145,7 @@ class MusicPlayerUI(QMainWindow):
     def cleanDetails(self):
         # clear the remaining from previous play
         self.lrcPlayer.file = None
-        self.music_player.player.stop()
+        self.music_player.stop()
         self.track_display.setText("No Track Playing")
         self.image_display.clear()
         self.song_details.clear()
@@ -1115,11 +1192,19 @@ class MusicPlayerUI(QMainWindow):
             print("File path not found.")
 
     def song_initializing_stuff(self):
+        self.readahead.record_access(self.music_file)
         self.update_information()
         self.get_lrc_file()
         self.music_player.update_music_file(self.music_file)
+        self.resume_positions.track(self.music_file, previous_finished=self.music_player.gapless_handoff)
+        if self.saved_position is None:
+            self.saved_position = self.resume_positions.resume_position(self.music_file)  # long tracks only
         self.music_player.default_pause_state()
         self.play_song()
+        self.saved_position = None  # only for this start of this track
+        self.readahead.warm(self.get_upcoming_song_files(self.readahead.track_count))
+        if self.lrcPlayer.show_lyrics:
+            self.lrcPlayer.prefetch_lyrics(self.lrc_file_for(self.get_next_song_file()))
 
     def get_random_song_list(self):
         # Create a list excluding the current song (self.music_file)
@@ -1171,6 +1256,17 @@ class MusicPlayerUI(QMainWindow):
             next_song = self.songTableWidget.get_next_song_object(fromstart=False)
             self.handleRowDoubleClick(next_song)
 
+    def get_next_song_file(self):
+        # the file that the end of the current song will advance to, used to preload it for gapless playback
+        upcoming = self.get_upcoming_song_files(1)
+        return upcoming[0] if upcoming else None
+
+    def get_upcoming_song_files(self, count):
+        if self.music_player.music_on_shuffle:
+            next_index = (self.current_playing_random_song_index or 0) + 1
+            return self.random_song_list[next_index:next_index + count]
+        return self.songTableWidget.peek_upcoming_song_files(count)
+
     def play_random_song(self, user_clicking=False, from_shortcut=False):
         if not self.songTableWidget.files_on_playlist:
             return
@@ -1232,7 +1328,7 @@ class MusicPlayerUI(QMainWindow):
 
     def stop_song(self):
         if self.music_player.started_playing:
-            self.music_player.player.stop()
+            self.music_player.stop()
             self.lrcPlayer.started_player = False
             self.lrcPlayer.disconnect_syncing()
             self.play_pause_button.setIcon(QIcon(os.path.join(self.script_path, "media-icons", "play.ico")))
@@ -1245,17 +1341,15 @@ class MusicPlayerUI(QMainWindow):
         if self.lrcPlayer.show_lyrics:
             self.lrcPlayer.sync_lyrics(self.lrc_file)
         else:
-            if self.lrcPlayer.media_sync_connected:
-                self.music_player.player.positionChanged.disconnect(self.lrcPlayer.update_media_lyric)
-                self.lrcPlayer.media_sync_connected = False
+            self.lrcPlayer.disconnect_media_lyric()
 
         self.music_player.started_playing = True
         self.music_player.play()
 
         if self.saved_position:
-            self.music_player.player.setPosition(int(self.saved_position))
-        else:
-            self.music_player.player.setPosition(int(0))
+            self.music_player.set_position(int(self.saved_position))
+        elif not self.music_player.gapless_handoff:  # a handed off song is already a few ms into playing
+            self.music_player.set_position(int(0))
 
     def seekBack(self):
         self.music_player.seek_backward()
@@ -1278,17 +1372,17 @@ class MusicPlayerUI(QMainWindow):
 
     def update_player_from_slider(self, position):
         # Set the media player position when the slider is moved
-        self.music_player.player.setPosition(position)
+        self.music_player.set_position(position)
 
-    def get_lrc_file(self):
-        if self.music_file.endswith(".ogg"):
-            lrc = self.music_file.replace(".ogg", ".lrc")
-        elif self.music_file.endswith(".mp3"):
-            lrc = self.music_file.replace(".mp3", ".lrc")
-        else:
-            lrc = None
+    def lrc_file_for(self, music_file):
+        # found by the library scan, see AlbumTreeWidget.find_lyrics_source
+        if music_file is None:
+            return None
+        return self.albumTreeWidget.get_lyrics_source(music_file)
 
-        if lrc and os.path.exists(lrc):
+    def get_lrc_file(self):
+        lrc = self.lrc_file_for(self.music_file)
+        if lrc:
             self.lrc_file = lrc
         else:
             self.lrc_file = None
@@ -1312,6 +1406,13 @@ class MusicPlayerUI(QMainWindow):
             self.showFullScreen()
 
     def extract_and_set_album_art(self):
+        from mutagen import File
+        from mutagen.flac import FLAC
+        from mutagen.id3 import ID3, ID3NoHeaderError
+        from mutagen.oggvorbis import OggVorbis
+        from mutagen.mp3 import MP3
+        from mutagen.mp4 import MP4
+
         audio_file = File(self.music_file)
 
         if isinstance(audio_file, MP3):
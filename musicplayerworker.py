@@ -1,53 +1,241 @@
-from PyQt6.QtCore import QThread, QObject, pyqtSignal, QUrl
+import threading
+import time
+from collections import namedtuple
+from PyQt6.QtCore import QThread, QObject, pyqtSignal, pyqtSlot, QUrl
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 
+# Immutable snapshot of the worker's player, published to the gui thread after every command and state change
+PlayerState = namedtuple("PlayerState", ["file", "position", "duration", "playing", "media_status", "handoff"])
+
+LATENCY_BUCKETS = 24  # bucket 0 is < 1 µs, bucket n counts latencies in [2^(n-1), 2^n) µs
+
 
 def handle_buffer_status(percent_filled):
     print(f"Buffer status: {percent_filled}%")
 
 
+def latency_bucket(latency_ns):
+    return min((latency_ns // 1000).bit_length(), LATENCY_BUCKETS - 1)
+
+
+def format_bucket(bucket):
+    upper_us = 2 ** bucket
+    if upper_us < 1000:
+        return f"{upper_us}µs"
+    return f"{upper_us / 1000:.1f}ms"
+
+
 class MusicPlayerWorker(QObject):
+    """
+    Owns the media players and lives in the music player's QThread.
+    The gui only talks to it through queued command signals (see MusicPlayer),
+    and gets position ticks and PlayerState snapshots back.
+    """
     # Define signals if needed (for future callbacks or status updates)
     started = pyqtSignal()
 
-    def __init__(self, handle_media_status_changed):
-        super().__init__()
-        self.player = QMediaPlayer()
-        self.audio_output = QAudioOutput()
-        self.player.setAudioOutput(self.audio_output)
+    # Forwarded from whichever of the two media players is currently active
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    mediaStatusChanged = pyqtSignal(object)
+    stateChanged = pyqtSignal(object)
 
-        # Connect the buffer status signal to a custom method
-        self.player.bufferProgressChanged.connect(handle_buffer_status)
+    # Emitted once per track when it gets close enough to the end to preroll the next one
+    aboutToFinish = pyqtSignal()
 
-        # Connect the mediaStatusChanged signal to a slot
-        self.player.mediaStatusChanged.connect(handle_media_status_changed)
+    PRELOAD_WINDOW = 5000  # milliseconds before the end of a track at which the next track is opened
+    MediaStatus = QMediaPlayer.MediaStatus
 
-        self.positionChanged = self.player.positionChanged
-        self.durationChanged = self.player.durationChanged
-
-        self.MediaStatus = QMediaPlayer.MediaStatus
+    def __init__(self):
+        super().__init__()
+        # Two pipelines: the active one plays, the standby one holds the next track already opened.
+        # They are created in setup() so that they belong to the worker thread.
+        self.player = None
+        self.standby_player = None
+
+        self.current_file = None
+        self.preloaded_file = None
+        self.handoff = False  # True after the standby player took over at end of media
+        self.about_to_finish_emitted = False
+        self.forward_positions = False  # only on while a visible ui needs position ticks
+
+        self.latency_histograms = {}  # command name -> list of bucket counts
+        self.latency_lock = threading.Lock()  # the report is read from the gui thread
+
+    @pyqtSlot()
+    def setup(self):
+        self.player = self.create_media_player()
+        self.standby_player = self.create_media_player()
+        self.publish_state()
+
+    def create_media_player(self):
+        player = QMediaPlayer()
+        player.setAudioOutput(QAudioOutput(player))
 
-    def play(self):
+        # Connect the buffer status signal to a custom method
+        player.bufferProgressChanged.connect(handle_buffer_status)
+
+        # Only the active player's signals are forwarded, so connections made on the worker survive swaps
+        player.positionChanged.connect(lambda position, source=player: self.on_position_changed(source, position))
+        player.durationChanged.connect(lambda duration, source=player: self.on_duration_changed(source, duration))
+        player.mediaStatusChanged.connect(lambda status, source=player: self.on_media_status_changed(source, status))
+        player.playbackStateChanged.connect(lambda state, source=player: self.on_playback_state_changed(source))
+        return player
+
+    def publish_state(self):
+        self.stateChanged.emit(PlayerState(
+            file=self.current_file,
+            position=self.player.position(),
+            duration=self.player.duration(),
+            playing=self.player.isPlaying(),
+            media_status=self.player.mediaStatus(),
+            handoff=self.handoff,
+        ))
+
+    def record_latency(self, command, sent_at):
+        """Time from the gui posting a command until the worker finished executing it."""
+        bucket = latency_bucket(time.perf_counter_ns() - sent_at)
+        with self.latency_lock:
+            self.latency_histograms.setdefault(command, [0] * LATENCY_BUCKETS)[bucket] += 1
+
+    def latency_report(self):
+        with self.latency_lock:
+            histograms = {command: list(histogram) for command, histogram in self.latency_histograms.items()}
+
+        lines = []
+        for command, histogram in sorted(histograms.items()):
+            count = sum(histogram)
+            if not count:
+                continue
+
+            # percentiles are reported as the upper bound of the bucket they fall into
+            percentiles = {}
+            seen = 0
+            for bucket, bucket_count in enumerate(histogram):
+                seen += bucket_count
+                for name, fraction in (("p50", 0.5), ("p99", 0.99)):
+                    if name not in percentiles and seen >= count * fraction:
+                        percentiles[name] = format_bucket(bucket)
+            worst = max(bucket for bucket, bucket_count in enumerate(histogram) if bucket_count)
+
+            lines.append(f"{command}: {count} commands, p50 < {percentiles['p50']}, "
+                         f"p99 < {percentiles['p99']}, max < {format_bucket(worst)}")
+        return "\n".join(lines)
+
+    def on_position_changed(self, source, position):
+        if source is not self.player:
+            return
+        if self.forward_positions:
+            self.positionChanged.emit(position)
+
+        duration = source.duration()
+        if not self.about_to_finish_emitted and 0 < duration - position <= self.PRELOAD_WINDOW:
+            self.about_to_finish_emitted = True
+            self.aboutToFinish.emit()
+
+    def on_duration_changed(self, source, duration):
+        if source is self.player:
+            self.durationChanged.emit(duration)
+            self.publish_state()
+
+    def on_playback_state_changed(self, source):
+        if source is self.player:
+            self.publish_state()
+
+    def on_media_status_changed(self, source, status):
+        if source is not self.player:
+            return  # the standby player loading in the background is not interesting to the ui
+
+        if status == self.MediaStatus.EndOfMedia and self.standby_is_ready():
+            # start the prerolled track right away, the ui catches up through the usual end of media handling
+            self.swap_players()
+            self.player.play()
+            self.handoff = True
+
+        self.publish_state()
+        self.mediaStatusChanged.emit(status)
+
+    def standby_is_ready(self):
+        return self.preloaded_file is not None and self.standby_player.mediaStatus() in (
+            self.MediaStatus.LoadedMedia, self.MediaStatus.BufferedMedia)
+
+    def swap_players(self):
+        finished_player = self.player
+        self.player, self.standby_player = self.standby_player, finished_player
+        finished_player.stop()
+        finished_player.setSource(QUrl())  # release the file handle of the finished track
+
+        self.current_file = self.preloaded_file
+        self.preloaded_file = None
+        self.about_to_finish_emitted = False
+        self.durationChanged.emit(self.player.duration())
+
+    # Commands, posted from the gui thread through queued signals
+
+    @pyqtSlot('qint64')
+    def play(self, sent_at):
         self.started.emit()  # Emit a signal when the player starts, if needed
+        self.handoff = False
         self.player.play()
+        self.record_latency("play", sent_at)
 
-    def pause(self):
+    @pyqtSlot('qint64')
+    def pause(self, sent_at):
         self.player.pause()
+        self.publish_state()
+        self.record_latency("pause", sent_at)
 
-    def stop(self):
+    @pyqtSlot('qint64')
+    def stop(self, sent_at):
+        self.handoff = False
         self.player.stop()
+        self.publish_state()
+        self.record_latency("stop", sent_at)
 
-    def position(self):
-        return self.player.position()
-
-    def isPlaying(self):
-        return self.player.isPlaying()
-
-    def setSource(self, file):
-        self.player.setSource(QUrl.fromLocalFile(file))
-
-    def setPosition(self, position=int()):
+    @pyqtSlot('qint64', 'qint64')
+    def seek(self, position, sent_at):
         self.player.setPosition(position)
-
-    def duration(self):
-        return self.player.duration()
+        self.publish_state()
+        self.record_latency("seek", sent_at)
+
+    @pyqtSlot(str, 'qint64')
+    def load(self, file, sent_at):
+        self.handoff = False
+        self.about_to_finish_emitted = False
+
+        if file == self.preloaded_file:
+            # skipping to the preloaded track early still benefits from it being opened already
+            self.swap_players()
+        else:
+            self.player.setSource(QUrl.fromLocalFile(file))
+            self.current_file = file
+            self.discard_preload()  # it was the next track of the previous song
+
+        self.publish_state()
+        self.record_latency("load", sent_at)
+
+    @pyqtSlot(bool, 'qint64')
+    def set_position_updates(self, enabled, sent_at):
+        self.forward_positions = enabled
+        if enabled:
+            self.publish_state()  # lets the clock resynchronize right away
+        self.record_latency("position_updates", sent_at)
+
+    @pyqtSlot('qint64')
+    def clear_preload(self, sent_at):
+        """Forget the preloaded track, the next one has changed (repeat, shuffle or playlist edits)."""
+        self.discard_preload()
+        self.record_latency("clear_preload", sent_at)
+
+    def discard_preload(self):
+        if self.preloaded_file is not None:
+            self.preloaded_file = None
+            self.standby_player.setSource(QUrl())
+
+    @pyqtSlot(str, 'qint64')
+    def preload(self, file, sent_at):
+        """Open the given file on the standby player so that it can start without any loading delay."""
+        if file != self.current_file and file != self.preloaded_file:
+            self.preloaded_file = file
+            self.standby_player.setSource(QUrl.fromLocalFile(file))
+        self.record_latency("preload", sent_at)
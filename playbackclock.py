@@ -0,0 +1,124 @@
+import time
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+
+class PlaybackClock(QObject):
+    """
+    Single source of the playback position for the ui.
+
+    The worker's position ticks and state snapshots anchor the clock, and in between the position
+    is interpolated with time.monotonic(). Subscribers register with the maximum rate they need,
+    and one timer calls each of them with the position no more often than that.
+    Listeners are not called periodically but only when the timeline is discontinuous: on seeks,
+    play/pause, a new track, or when the player drifts away from the interpolated position.
+    When nobody is subscribed or listening the clock goes idle and emits activeChanged(False), so the player can stop
+    sending position ticks altogether until a subscriber comes back.
+    """
+    activeChanged = pyqtSignal(bool)
+
+    DRIFT_TOLERANCE = 250  # milliseconds the player may differ from the interpolation before listeners hear of it
+
+    def __init__(self):
+        super().__init__()
+        self.anchor_position = 0  # milliseconds
+        self.anchor_time = time.monotonic()
+        self.duration = 0
+        self.playing = False
+
+        self.subscribers = {}  # callback -> [interval in seconds, monotonic time of the last call]
+        self.listeners = []  # callbacks for timeline discontinuities
+        self.active = False
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+    def position(self):
+        if not self.playing:
+            return self.anchor_position
+
+        position = self.anchor_position + int((time.monotonic() - self.anchor_time) * 1000)
+        if self.duration > 0:
+            position = min(position, self.duration)
+        return position
+
+    def sync(self, position, playing=None, duration=None):
+        """Re-anchor the clock on a position reported by the player or requested by the user."""
+        drifted = abs(position - self.position()) > self.DRIFT_TOLERANCE
+
+        self.anchor_position = position
+        self.anchor_time = time.monotonic()
+        if duration is not None:
+            self.duration = duration
+
+        if playing is not None and playing != self.playing:
+            self.playing = playing
+            self.update_timer()
+            self.notify_all()  # paused or resumed, everyone should show the exact position now
+        elif drifted:
+            self.notify_listeners()
+
+    def jump(self, position):
+        """A seek: move the clock and let every subscriber catch up immediately."""
+        self.anchor_position = position
+        self.anchor_time = time.monotonic()
+        self.notify_all()
+
+    def subscribe(self, callback, max_rate):
+        """Call callback(position_ms) at most max_rate times per second while playing."""
+        self.subscribers[callback] = [1.0 / max_rate, 0.0]
+        self.update_timer()
+        callback(self.position())
+
+    def unsubscribe(self, callback):
+        self.subscribers.pop(callback, None)
+        self.update_timer()
+
+    def add_listener(self, callback):
+        """Call callback(position_ms) whenever the timeline jumps, starts or stops."""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+            self.update_timer()
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+            self.update_timer()
+
+    def update_timer(self):
+        active = bool(self.subscribers or self.listeners)
+        if active != self.active:
+            self.active = active
+            self.activeChanged.emit(active)
+
+        if not self.playing or not self.subscribers:
+            self.timer.stop()
+            return
+
+        interval = min(interval for interval, _ in self.subscribers.values())
+        self.timer.setInterval(max(int(interval * 1000), 1))
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def notify_listeners(self):
+        position = self.position()
+        for callback in list(self.listeners):
+            callback(position)
+
+    def notify_all(self):
+        now = time.monotonic()
+        position = self.position()
+        for callback, schedule in list(self.subscribers.items()):
+            schedule[1] = now
+            callback(position)
+        self.notify_listeners()
+
+    def tick(self):
+        now = time.monotonic()
+        position = self.position()
+        for callback, schedule in list(self.subscribers.items()):
+            interval, last_called = schedule
+            # a little slack so that a subscriber at the timer's own rate is not skipped on jitter
+            if now - last_called >= interval * 0.9:
+                schedule[1] = now
+                callback(position)
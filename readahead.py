@@ -0,0 +1,127 @@
+import os
+import threading
+from collections import OrderedDict
+
+"""
+Warms the operating system's page cache for the next songs in the queue,
+so that starting them does not wait on a sleeping usb disk or a network share.
+
+Only one chunk sized buffer is ever held in memory, the data itself lives in the page cache.
+"""
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB per read
+
+
+def warm_file(path, max_bytes, should_continue):
+    """Pull the first max_bytes of the file into the page cache. Returns the bytes warmed, None if it was stopped."""
+    size = os.path.getsize(path)
+    length = min(size, max_bytes)
+
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            # let the kernel start one large sequential read right away
+            os.posix_fadvise(f.fileno(), 0, length, os.POSIX_FADV_WILLNEED)
+
+        buffer = bytearray(CHUNK_SIZE)
+        warmed = 0
+        while warmed < length and should_continue():
+            read = f.readinto(buffer)
+            if not read:
+                break
+            warmed += read
+
+    if warmed < length:
+        return None  # no longer wanted, or the file got shorter while reading
+    return length
+
+
+class ReadAheadCache:
+    def __init__(self, byte_budget, track_count=2):
+        self.byte_budget = byte_budget
+        self.track_count = track_count
+
+        self.warmed = OrderedDict()  # file path -> warmed bytes, oldest first
+        self.warmed_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.wanted = []  # the files the latest warm() call asked for, in queue order
+        self.failed = set()  # wanted files that could not be read, tried again when the window changes
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def warm(self, files):
+        """Replace the read-ahead window with the given upcoming files. Returns immediately."""
+        with self.condition:
+            self.wanted = [file for file in files[:self.track_count] if file]
+            self.failed.clear()
+            self.condition.notify()
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def record_access(self, file):
+        """Count whether a song that is about to start was read ahead."""
+        with self.condition:
+            if file in self.warmed:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self.condition:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "warmed_files": len(self.warmed),
+                "warmed_bytes": self.warmed_bytes,
+                "byte_budget": self.byte_budget,
+            }
+
+    def next_file_to_warm(self):
+        for file in self.wanted:
+            if file not in self.warmed and file not in self.failed:
+                return file
+        return None
+
+    def run(self):
+        while True:
+            with self.condition:
+                file = self.next_file_to_warm()
+                while file is None:
+                    self.condition.wait()
+                    file = self.next_file_to_warm()
+                # the earlier a song is in the queue, the more of the budget it may use:
+                # shares of n, n - 1, ... 1 out of n * (n + 1) / 2 for a queue of n songs
+                count = len(self.wanted)
+                max_bytes = self.byte_budget * 2 * (count - self.wanted.index(file)) // (count * (count + 1))
+
+            def still_wanted(target=file):
+                return target in self.wanted
+
+            try:
+                warmed = warm_file(file, max_bytes, still_wanted)
+            except OSError as e:
+                print(f"Read-ahead failed for {file}: {e}")
+                with self.condition:
+                    self.failed.add(file)
+                continue
+
+            # only files read in full count as warmed, one that is no longer wanted is simply dropped
+            with self.condition:
+                if warmed is not None:
+                    self.remember(file, warmed)
+                elif file in self.wanted:
+                    self.failed.add(file)  # still wanted, so it ended early, reading it again would not help
+
+    def remember(self, file, warmed):
+        self.warmed[file] = warmed
+        self.warmed_bytes += warmed
+
+        # forget the oldest files once the budget is used up, the kernel is free to evict them anyway
+        while self.warmed_bytes > self.byte_budget and len(self.warmed) > 1:
+            _, forgotten = self.warmed.popitem(last=False)
+            self.warmed_bytes -= forgotten
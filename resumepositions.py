@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import time
+from PyQt6.QtCore import QTimer
+
+
+class ResumePositions:
+    """
+    Where each track was left, kept in the song catalogue (databases/songs.db) next to the songs table.
+
+    The position of the playing track is read from the playback clock every CHECKPOINT_INTERVAL
+    and only kept in memory, the changed entries are written together in one transaction every FLUSH_INTERVAL,
+    on track changes and on exit.
+    Pausing or stopping writes the position right away, after that a paused or stopped track costs no writes.
+    """
+
+    CHECKPOINT_INTERVAL = 5000  # milliseconds
+    FLUSH_INTERVAL = 30.0  # seconds
+    END_MARGIN = 2 * CHECKPOINT_INTERVAL  # milliseconds, a track this close to its end was finished
+    MIN_RESUME_DURATION = 10 * 60 * 1000  # tracks shorter than this start from the beginning when played again
+
+    def __init__(self, config_path, clock):
+        self.db_path = os.path.join(config_path, "databases", "songs.db")
+        self.clock = clock
+        self.current_file = None
+        self.played = False  # the current track has actually played, a loaded and stopped one keeps its position
+        self.pending = {}  # file path -> (position, duration, playing, updated_at) not written yet
+        self.written = {}  # file path -> (position, playing) as in the database
+        self.last_flush = time.monotonic()
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS resume_positions (
+                        file_path TEXT PRIMARY KEY,
+                        position INTEGER,
+                        duration INTEGER,
+                        playing INTEGER,
+                        updated_at REAL
+                    )
+                ''')
+        except sqlite3.Error as e:
+            print(f"Resume positions database error: {e}")
+
+        self.timer = QTimer()
+        self.timer.setInterval(self.CHECKPOINT_INTERVAL)
+        self.timer.timeout.connect(self.on_checkpoint_timer)
+
+    def track(self, file_path, previous_finished=False):
+        """A new track starts playing, the previous one is checkpointed where it was left."""
+        if previous_finished and self.current_file is not None and self.played:
+            # handed off at its end, the clock already belongs to the new track
+            self.pending[self.current_file] = (0, 0, 0, time.time())
+        else:
+            self.checkpoint()
+        self.flush()
+        self.current_file = file_path
+        self.played = False
+        self.timer.start()
+
+    def on_checkpoint_timer(self):
+        self.checkpoint()
+        if time.monotonic() - self.last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def checkpoint(self):
+        if self.current_file is None:
+            return
+        if self.clock.playing:
+            self.played = True
+        if not self.played:
+            return
+
+        position = self.clock.position()
+        duration = self.clock.duration
+        if duration and position >= duration - self.END_MARGIN:
+            position = 0  # finished
+
+        playing = int(self.clock.playing)
+        if self.written.get(self.current_file) == (position, playing):
+            return  # nothing has changed since the last write, e.g. while paused
+        self.pending[self.current_file] = (position, duration, playing, time.time())
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+
+        rows = [(file_path, position, duration, playing, updated_at)
+                for file_path, (position, duration, playing, updated_at) in self.pending.items()]
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany('''
+                    REPLACE INTO resume_positions (file_path, position, duration, playing, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+        except sqlite3.Error as e:
+            print(f"Resume positions database error: {e}")
+            return
+
+        for file_path, position, _, playing, _ in rows:
+            self.written[file_path] = (position, playing)
+        self.pending.clear()
+
+    def save(self):
+        """Checkpoint and write right away, e.g. on pause or stop, so that a crash cannot lose the position."""
+        self.checkpoint()
+        self.flush()
+
+    def get(self, file_path):
+        """(position, duration, playing) of a track, None if it has never been played."""
+        if file_path in self.pending:
+            return self.pending[file_path][:3]
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute('SELECT position, duration, playing FROM resume_positions WHERE file_path = ?',
+                                   (file_path,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Resume positions database error: {e}")
+            return None
+        return row
+
+    def resume_position(self, file_path):
+        """The position to start a long track at, None for short or finished ones."""
+        entry = self.get(file_path)
+        if entry is None:
+            return None
+        position, duration, _ = entry
+        if position and duration and duration >= self.MIN_RESUME_DURATION:
+            return position
+        return None
+
+    def last_played(self):
+        """(file path, position, playing) of the track played last, None before anything has been played."""
+        self.flush()
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                return conn.execute('''
+                    SELECT file_path, position, playing FROM resume_positions ORDER BY updated_at DESC LIMIT 1
+                ''').fetchone()
+        except sqlite3.Error as e:
+            print(f"Resume positions database error: {e}")
+            return None
+
+    def shutdown(self):
+        self.timer.stop()
+        self.checkpoint()
+        self.flush()
@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import struct
+from PyQt6.QtCore import QTimer
+
+"""
+Append-only journal of the session, so that a crash loses no more than a few seconds of it.
+
+table_data.json (the playlist) and the config are only complete after a clean exit, everything that changes them
+in between is appended here as a fixed-size 16 byte record: kind, song, value.
+Songs are referred to by their rowid in the song catalogue (songs.db), so records never carry a path.
+
+    QUEUE_ADD          a song was added to the playlist
+    QUEUE_ALBUM_TITLE  an album title row was added, song is the album's first song
+    QUEUE_REMOVE       a song was removed from the playlist
+    MODES              shuffle / repeat / loop, value is a bit mask of MODE_KEYS
+
+The current track and its position are not journaled, ResumePositions keeps them in songs.db.
+Once the journal holds COMPACT_RECORDS records it is compacted: the playlist is saved, and the journal is replaced
+with just the modes. At startup the records are replayed on top of the saved playlist.
+A record cut short by a crash is where replaying stops, and it is cut off the file so that new records stay aligned.
+"""
+
+RECORD = struct.Struct("<BxxxIq")  # kind, song rowid, value
+
+QUEUE_ADD = 1
+QUEUE_ALBUM_TITLE = 2
+QUEUE_REMOVE = 3
+OLD_TRACK_KINDS = (4, 5)  # current track and position records of older journals, skipped when replaying
+MODES = 6
+
+# config keys of the playback modes, in the bit order of MODES records
+MODE_KEYS = ("shuffle", "repeat", "loop", "previous_loop", "previous_shuffle")
+
+
+def encode_modes(modes):
+    return sum(1 << bit for bit, key in enumerate(MODE_KEYS) if modes.get(key))
+
+
+def decode_modes(value):
+    return {key: bool(value & (1 << bit)) for bit, key in enumerate(MODE_KEYS)}
+
+
+class SessionJournal:
+    COMPACT_RECORDS = 1024
+
+    def __init__(self, config_path):
+        self.journal_path = os.path.join(config_path, "databases", "session.journal")
+        self.db_path = os.path.join(config_path, "databases", "songs.db")
+        self.file = None  # opened for appending on the first record
+        self.record_count = 0
+        self.replaying = False  # nothing is recorded while the journal itself is being replayed
+        self.snapshot = None  # callable saving the playlist, run before compacting
+        self.compact_pending = False
+
+        self.song_ids = {}  # file path -> rowid in songs.db
+        self.song_paths = {}  # rowid -> file path
+
+        self.modes = None  # the state a compacted journal starts with
+
+    def song_id(self, file_path):
+        if file_path not in self.song_ids:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    row = conn.execute('SELECT rowid FROM songs WHERE file_path = ?', (file_path,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"Session journal database error: {e}")
+                return None
+            if row is None:
+                return None
+            self.song_ids[file_path] = row[0]
+            self.song_paths[row[0]] = file_path
+        return self.song_ids[file_path]
+
+    def song_path(self, song_id):
+        if song_id not in self.song_paths:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    row = conn.execute('SELECT file_path FROM songs WHERE rowid = ?', (song_id,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"Session journal database error: {e}")
+                return None
+            if row is None:
+                return None
+            self.song_paths[song_id] = row[0]
+            self.song_ids[row[0]] = song_id
+        return self.song_paths[song_id]
+
+    def append(self, kind, file_path=None, value=0):
+        if self.replaying:
+            return
+
+        song_id = 0
+        if file_path is not None:
+            song_id = self.song_id(file_path)
+            if song_id is None:
+                return  # not in the catalogue
+
+        try:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+                self.file = open(self.journal_path, "ab")
+            self.file.write(RECORD.pack(kind, song_id, value))
+            self.file.flush()  # in the os's hands, a crash of the player cannot lose it anymore
+        except OSError as e:
+            print(f"Session journal error: {e}")
+            return
+
+        self.record_count += 1
+        if self.record_count >= self.COMPACT_RECORDS and not self.compact_pending:
+            # records are written just before the playlist changes, the snapshot has to wait until it has
+            self.compact_pending = True
+            QTimer.singleShot(0, self.compact_if_pending)
+
+    def compact_if_pending(self):
+        if self.compact_pending:
+            self.compact()
+
+    def queue_add(self, file_path):
+        self.append(QUEUE_ADD, file_path)
+
+    def queue_album_title(self, first_song_path):
+        self.append(QUEUE_ALBUM_TITLE, first_song_path)
+
+    def queue_remove(self, file_path):
+        self.append(QUEUE_REMOVE, file_path)
+
+    def set_modes(self, modes):
+        value = encode_modes(modes)
+        if value != self.modes:
+            self.modes = value
+            self.append(MODES, value=value)
+
+    def replay(self):
+        """The journaled records as (kind, file path, value), the state they end in is taken over."""
+        try:
+            with open(self.journal_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            print(f"Session journal error: {e}")
+            return []
+
+        records = []
+        end = 0  # of the last whole, valid record
+        for offset in range(0, len(data) - RECORD.size + 1, RECORD.size):
+            kind, song_id, value = RECORD.unpack_from(data, offset)
+            if not QUEUE_ADD <= kind <= MODES:
+                break  # torn or garbage tail
+            end = offset + RECORD.size
+            if kind in OLD_TRACK_KINDS:
+                continue
+
+            file_path = self.song_path(song_id) if song_id else None
+            if kind == MODES:
+                self.modes = value
+            records.append((kind, file_path, value))
+
+        if end < len(data):
+            self.truncate(end)
+
+        self.record_count = end // RECORD.size
+        return records
+
+    def truncate(self, size):
+        # appending after a torn record would shift every later record off the 16 byte grid
+        print(f"Session journal: dropping a torn tail after {size // RECORD.size} records")
+        try:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(size)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"Session journal error: {e}")
+
+    def compact(self, take_snapshot=True):
+        """Save the playlist and start the journal over from the modes."""
+        self.compact_pending = False
+        if take_snapshot and self.snapshot is not None:
+            self.snapshot()
+
+        state = []
+        if self.modes is not None:
+            state.append(RECORD.pack(MODES, 0, self.modes))
+
+        temporary_path = f"{self.journal_path}.tmp"
+        try:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            with open(temporary_path, "wb") as f:
+                f.write(b"".join(state))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary_path, self.journal_path)
+        except OSError as e:
+            print(f"Session journal error: {e}")
+            return
+        self.record_count = len(state)
+
+    def close(self):
+        # a clean exit, the playlist has just been saved
+        self.compact(take_snapshot=False)
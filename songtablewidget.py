@@ -53,16 +53,6 @@ class SongTableWidget(QTableWidget):
         self.load_table_data()
         self.setSortingEnabled(False)  # Disable default sorting to use custom sorting
 
-    def save_currently_playing_song(self):
-        currently_playing_song = self.parent.music_file
-        current_position_in_second = self.parent.music_player.get_current_time()
-        data = {currently_playing_song: current_position_in_second}
-        if currently_playing_song is None:
-            return
-        else:
-            self.parent.ej.edit_value("last_played_song", data)
-            print(f"saved {currently_playing_song} to config file")
-
     def load_table_data(self):
         print("Started loading table data")
 
@@ -165,16 +155,16 @@ class SongTableWidget(QTableWidget):
 
             data.append(row_data)
 
-        # Save the data and metadata to a file
+        # Save the data and metadata to a file, through a temporary file so a crash never leaves half of it
+        temporary_file = f"{self.json_file}.tmp"
         try:
-            with open(self.json_file, 'w') as file:
+            with open(temporary_file, 'w') as file:
                 json.dump(data, file, indent=4)
+            os.replace(temporary_file, self.json_file)
             print(f"Data successfully saved to {self.json_file}")
-            file.close()
         except IOError as e:
             print(f"Failed to save data to {self.json_file}: {e}")
 
-        self.save_currently_playing_song()
 
     @staticmethod
     def get_table_data(table_widget):
@@ -200,8 +190,8 @@ class SongTableWidget(QTableWidget):
 
     def get_previous_song_object(self, clicking=False):
         if self.parent.music_player.music_on_repeat and not clicking:
-            self.parent.music_player.music_player.setPosition(0)
-            self.parent.music_player.music_player.play()
+            self.parent.music_player.set_position(0)
+            self.parent.music_player.play()
             return
 
         if self.song_playing_row is None:
@@ -247,8 +237,8 @@ class SongTableWidget(QTableWidget):
 
     def get_next_song_object(self, fromstart=False, clicking=None):
         if self.parent.music_player.music_on_repeat and not clicking:
-            self.parent.music_player.music_player.setPosition(0)
-            self.parent.music_player.music_player.play()
+            self.parent.music_player.set_position(0)
+            self.parent.music_player.play()
             return
 
         if self.song_playing_row is None:
@@ -291,6 +281,31 @@ class SongTableWidget(QTableWidget):
 
         return item
 
+    def peek_upcoming_song_files(self, count):
+        """Returns up to count file paths that follow the playing row, wrapping around when the playlist loops."""
+        files = []
+        if self.song_playing_row is None:
+            return files
+
+        row = self.song_playing_row
+        for _ in range(self.rowCount()):
+            row += 1
+            if row >= self.rowCount():
+                if not self.parent.music_player.playlist_on_loop:
+                    break
+                row = 0
+
+            if row == self.song_playing_row:
+                break  # went around the whole playlist
+
+            file_item = self.item(row, 7)  # album title rows have no file path
+            if file_item and file_item.text():
+                files.append(file_item.text())
+                if len(files) == count:
+                    break
+
+        return files
+
     def setNextRow(self, currentItem):
         if currentItem:
             if "Album Title:" in currentItem.text():
@@ -370,6 +385,7 @@ class SongTableWidget(QTableWidget):
                 # Remove the file path from files_on_playlist
                 if file_path in self.files_on_playlist:
                     self.files_on_playlist.remove(file_path)
+                    self.parent.session_journal.queue_remove(file_path)
                     # removing songs from random_song_list on the way
                     if self.parent.random_song_list:
                         self.parent.random_song_list.remove(file_path)
@@ -381,8 +397,25 @@ class SongTableWidget(QTableWidget):
         for row in sorted(rows_to_remove, reverse=True):
             self.removeRow(row)
 
+        self.remove_empty_album_titles(selected_album_names)
+        self.parent.music_player.invalidate_preload()  # the next song may have been removed
+
+    def remove_song_row(self, file_path):
+        # replaying a removal from the session journal
+        for item in self.findItems(file_path, Qt.MatchFlag.MatchExactly):
+            if item.column() == 7:
+                album_name_item = self.item(item.row(), 2)
+                album_name = album_name_item.text() if album_name_item else None
+                self.removeRow(item.row())
+                if file_path in self.files_on_playlist:
+                    self.files_on_playlist.remove(file_path)
+                if album_name is not None:
+                    self.remove_empty_album_titles({album_name})
+                return
+
+    def remove_empty_album_titles(self, album_names):
         # Check for any remaining album title rows without related songs
-        for album_name in selected_album_names:
+        for album_name in album_names:
             album_title_row_text = f"Album Title: [{album_name}]"
             matched_songs_with_same_album_name = self.findItems(album_name, Qt.MatchFlag.MatchExactly)
 
@@ -410,7 +443,7 @@ class SongTableWidget(QTableWidget):
 
         elif event.key() == Qt.Key.Key_0 or event.key() == Qt.Key.Key_Home:
             print("keyboard r pressing")
-            self.parent.music_player.music_player.setPosition(0)  # set position to start
+            self.parent.music_player.set_position(0)  # set position to start
 
         elif event.key() == Qt.Key.Key_Down:
             super().keyPressEvent(
@@ -0,0 +1,99 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from PyQt6.QtCore import QObject, QEvent
+
+"""
+Wall time of the phases of a start, from the first import to the first paint of the main window.
+
+Phases are timed with startup_tracer.phase("name") around the code that does the work, they can be nested.
+Once the main window has painted the trace is finished: it is printed, written to startup_trace.json
+in the config folder, and later phase() calls (e.g. reloading the collection) cost nothing.
+"""
+
+
+class FirstPaintWatcher(QObject):
+    """Calls back on the first paint event of any widget in the given window."""
+
+    def __init__(self, app, window, callback):
+        super().__init__()
+        self.app = app
+        self.window = window
+        self.callback = callback
+        app.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and hasattr(obj, "window") and obj.window() is self.window:
+            self.app.removeEventFilter(self)
+            self.callback()
+        return False
+
+
+class StartupTracer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []  # [name, depth, start ms, duration ms]
+        self.depth = 0
+        self.finished = False
+        self.first_paint_watcher = None
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    @contextmanager
+    def phase(self, name):
+        if self.finished:
+            yield
+            return
+
+        record = [name, self.depth, self.elapsed_ms(), 0.0]
+        self.phases.append(record)
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            record[3] = self.elapsed_ms() - record[2]
+
+    def mark(self, name):
+        # a moment rather than a phase, e.g. the first paint
+        if not self.finished:
+            self.phases.append([name, self.depth, self.elapsed_ms(), 0.0])
+
+    def finish_on_first_paint(self, app, window, trace_file):
+        def on_first_paint():
+            self.mark("first paint")
+            self.finish(trace_file)
+            self.first_paint_watcher = None
+
+        self.first_paint_watcher = FirstPaintWatcher(app, window, on_first_paint)
+
+    def report(self):
+        lines = []
+        for name, depth, start, duration in self.phases:
+            indent = "  " * depth
+            if duration:
+                lines.append(f"{start:9.1f} ms  {indent}{name}: {duration:.1f} ms")
+            else:
+                lines.append(f"{start:9.1f} ms  {indent}{name}")
+        return "\n".join(lines)
+
+    def finish(self, trace_file=None):
+        if self.finished:
+            return
+        self.finished = True
+        print(f"Startup trace:\n{self.report()}")
+
+        if trace_file:
+            try:
+                os.makedirs(os.path.dirname(trace_file), exist_ok=True)
+                with open(trace_file, "w") as f:
+                    json.dump([{"name": name, "depth": depth, "start_ms": round(start, 2),
+                                "duration_ms": round(duration, 2)} for name, depth, start, duration in self.phases],
+                              f, indent=4)
+            except OSError as e:
+                print(f"Error: Failed to write to file {trace_file}. {e}")
+
+
+startup_tracer = StartupTracer()
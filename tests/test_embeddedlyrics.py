@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from embeddedlyrics import sylt_to_lrc
+from lrcparser import parse_lrc_text
+
+
+def test_syllables_are_grouped_into_lines():
+    frame = SimpleNamespace(text=[
+        ("Hel", 1000), ("lo ", 1250), ("world", 1500),
+        ("\nGood", 3000), ("bye", 3400), ("\n", 5000),
+    ])
+
+    assert sylt_to_lrc(frame) == ("[00:01.00]<00:01.00>Hel<00:01.25>lo <00:01.50>world\n"
+                                  "[00:03.00]<00:03.00>Good<00:03.40>bye")
+
+    timeline = parse_lrc_text(sylt_to_lrc(frame))
+    assert list(timeline.texts) == ["Hello world", "Goodbye"]
+
+
+def test_line_break_at_the_end_of_a_syllable_starts_the_next_line_at_the_next_syllable():
+    frame = SimpleNamespace(text=[("one\n", 0), ("two", 2000)])
+
+    assert sylt_to_lrc(frame) == "[00:00.00]<00:00.00>one\n[00:02.00]<00:02.00>two"
+
+
+def test_frames_without_line_breaks_hold_one_line_per_entry():
+    frame = SimpleNamespace(text=[("First line", 500), ("", 1000), ("Second line", 2000)])
+
+    assert sylt_to_lrc(frame) == "[00:00.50]First line\n[00:02.00]Second line"
@@ -0,0 +1,102 @@
+import codecs
+
+import pytest
+
+from lrcparser import decode_lrc, parse_lrc_file, parse_lrc_text, parse_timestamp
+
+
+@pytest.mark.parametrize("tag, seconds", [
+    ("01:02.34", 62.34),
+    ("01:02.345", 62.345),
+    ("01:02", 62.0),
+    ("01:02:34", 62.34),
+    ("1:02.5", 62.5),
+    ("123:00.00", 7380.0),
+])
+def test_timestamp_variants(tag, seconds):
+    assert parse_timestamp(tag) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("tag", ["ar:Artist", "offset:+250", "", ":12", "aa:bb.cc"])
+def test_tags_that_are_not_timestamps(tag):
+    assert parse_timestamp(tag) is None
+
+
+def test_simple_lines_are_sorted_by_time():
+    timeline = parse_lrc_text("[00:05.00]second\n[00:01.00]first\nno timestamp here\n")
+
+    assert list(timeline.times) == [1.0, 5.0]
+    assert timeline.texts == ("first", "second")
+
+
+def test_one_text_at_several_timestamps():
+    timeline = parse_lrc_text("[00:01.00][00:10.00]chorus\n[00:05.00]verse")
+
+    assert list(timeline.times) == [1.0, 5.0, 10.0]
+    assert timeline.texts == ("chorus", "verse", "chorus")
+
+
+def test_lines_with_the_same_timestamp_keep_their_order():
+    timeline = parse_lrc_text("[00:01.00]one\n[00:01.00]two\n[00:01.00]three")
+
+    assert timeline.texts == ("one", "two", "three")
+
+
+def test_timestamp_on_its_own_is_an_instrumental_break():
+    timeline = parse_lrc_text("[00:01.00]sung\n[00:03.00]\n[00:08.00]sung again")
+
+    assert timeline.texts == ("sung", "", "sung again")
+
+
+def test_id_tags_and_offset():
+    timeline = parse_lrc_text("[ar:Some Artist]\n[ti:Some Title]\n[offset:+500]\n[00:01.00]a\n[00:00.20]b")
+
+    assert timeline.metadata == {"ar": "Some Artist", "ti": "Some Title", "offset": "+500"}
+    # a positive offset brings the lyrics earlier, never before the start
+    assert list(timeline.times) == pytest.approx([0.0, 0.5])
+    assert timeline.texts == ("b", "a")
+
+
+def test_negative_and_broken_offsets():
+    assert list(parse_lrc_text("[offset:-1000]\n[00:01.00]a").times) == [2.0]
+    assert list(parse_lrc_text("[offset:soon]\n[00:01.00]a").times) == [1.0]
+
+
+def test_enhanced_word_timings():
+    timeline = parse_lrc_text("[00:01.00]<00:01.00>Hel<00:01.25>lo <00:01.50>world\n[00:03.00]plain line")
+
+    assert timeline.texts == ("Hello world", "plain line")
+    assert timeline.words == (((1.0, "Hel"), (1.25, "lo "), (1.5, "world")), ())
+
+
+def test_angle_bracket_that_is_not_a_timestamp_stays_in_the_text():
+    timeline = parse_lrc_text("[00:01.00]<3 you")
+
+    assert timeline.texts == ("<3 you",)
+    assert timeline.words is None
+
+
+@pytest.mark.parametrize("data", [
+    codecs.BOM_UTF8 + "[00:01.00]héllo".encode("utf-8"),
+    "[00:01.00]héllo".encode("utf-16"),  # with a bom
+    "[00:01.00]héllo".encode("utf-16-le"),
+    "[00:01.00]héllo".encode("utf-16-be"),
+    "[00:01.00]héllo".encode("utf-32"),
+    "[00:01.00]héllo".encode("utf-8"),
+])
+def test_encodings(data):
+    assert decode_lrc(data) == "[00:01.00]héllo"
+
+
+def test_gb18030_without_a_bom():
+    assert decode_lrc("[00:01.00]你好".encode("gb18030")) == "[00:01.00]你好"
+
+
+def test_parse_lrc_file(tmp_path):
+    path = tmp_path / "song.lrc"
+    path.write_bytes(codecs.BOM_UTF8 + "[ti:Title]\r\n[00:01.00]a\r\n[00:02.00]b\r\n".encode("utf-8"))
+
+    timeline = parse_lrc_file(str(path))
+
+    assert timeline.texts == ("a", "b")
+    assert timeline.metadata == {"ti": "Title"}
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from lyricscache import LyricsCache
+
+LYRICS = "[ti:Title]\n[00:01.00]first\n[00:02.00]<00:02.00>second <00:02.50>line\n"
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    os.makedirs(tmp_path / "databases")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def lrc_file(tmp_path):
+    path = tmp_path / "song.lrc"
+    path.write_text(LYRICS, encoding="utf-8")
+    return str(path)
+
+
+def test_parsed_once_then_from_memory(config_path, lrc_file):
+    cache = LyricsCache(config_path)
+
+    first = cache.load(lrc_file)
+    second = cache.load(lrc_file)
+
+    assert first.texts == ("first", "second line")
+    assert second is first
+    assert cache.stats()["parses"] == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_database_round_trip(config_path, lrc_file):
+    parsed = LyricsCache(config_path).load(lrc_file)
+
+    cache = LyricsCache(config_path)  # a new start, nothing in memory
+    loaded = cache.load(lrc_file)
+
+    assert cache.stats()["parses"] == 0
+    assert cache.stats()["disk_hits"] == 1
+    assert list(loaded.times) == list(parsed.times)
+    assert loaded.texts == parsed.texts
+    assert loaded.metadata == parsed.metadata
+    assert loaded.words == parsed.words
+
+
+def test_changed_file_is_parsed_again(config_path, lrc_file):
+    LyricsCache(config_path).load(lrc_file)
+    with open(lrc_file, "a", encoding="utf-8") as f:
+        f.write("[00:03.00]third\n")
+
+    cache = LyricsCache(config_path)
+    timeline = cache.load(lrc_file)
+
+    assert timeline.texts == ("first", "second line", "third")
+    assert cache.stats()["parses"] == 1
@@ -0,0 +1,59 @@
+from lrcparser import parse_lrc_text
+from lyricstimeline import LyricsTimeline
+
+
+def make_timeline():
+    return parse_lrc_text("[ar:Artist]\n[00:01.00]one\n[00:02.00]<00:02.00>two <00:02.50>words\n[00:04.00]three")
+
+
+def test_bytes_round_trip():
+    timeline = make_timeline()
+
+    copy = LyricsTimeline.from_bytes(timeline.to_bytes())
+
+    assert list(copy.times) == list(timeline.times)
+    assert copy.texts == timeline.texts
+    assert copy.metadata == timeline.metadata
+    assert copy.words == timeline.words
+
+
+def test_bytes_round_trip_of_an_empty_timeline():
+    copy = LyricsTimeline.from_bytes(LyricsTimeline().to_bytes())
+
+    assert not copy
+    assert copy.texts == ()
+    assert copy.words is None
+
+
+def test_seek_while_playing_on():
+    timeline = make_timeline()
+
+    assert timeline.seek(0.5) == 0
+    assert timeline.seek(1.0) == 1
+    assert timeline.seek(1.9) == 1
+    assert timeline.seek(2.1) == 2
+    assert timeline.seek(4.0) == 3
+    assert timeline.seek(60.0) == 3
+    assert timeline.next_time() is None
+
+
+def test_seek_backwards_and_forwards():
+    timeline = make_timeline()
+    timeline.seek(4.5)
+
+    assert timeline.seek(1.5) == 1
+    assert timeline.text_at(timeline.cursor - 1) == "one"
+    assert timeline.next_time() == 2.0
+
+    assert timeline.seek(3.0) == 2
+    assert timeline.seek(0.0) == 0
+    assert timeline.text_at(timeline.cursor - 1) == ""
+
+
+def test_move_to_is_clamped():
+    timeline = make_timeline()
+
+    timeline.move_to(10)
+    assert timeline.cursor == 3
+    timeline.move_to(-1)
+    assert timeline.cursor == 0
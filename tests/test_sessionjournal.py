@@ -0,0 +1,95 @@
+import os
+import sqlite3
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from sessionjournal import (RECORD, MODES, QUEUE_ADD, QUEUE_ALBUM_TITLE, QUEUE_REMOVE, SessionJournal,
+                            decode_modes, encode_modes)
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    os.makedirs(tmp_path / "databases")
+    with sqlite3.connect(tmp_path / "databases" / "songs.db") as conn:
+        conn.execute("CREATE TABLE songs (file_path TEXT PRIMARY KEY)")
+        conn.executemany("INSERT INTO songs (file_path) VALUES (?)", [("/music/a.mp3",), ("/music/b.mp3",)])
+    return str(tmp_path)
+
+
+def write_session(config_path):
+    journal = SessionJournal(config_path)
+    journal.queue_album_title("/music/a.mp3")
+    journal.queue_add("/music/a.mp3")
+    journal.queue_add("/music/b.mp3")
+    journal.queue_add("/music/not-in-the-catalogue.mp3")  # skipped
+    journal.queue_remove("/music/a.mp3")
+    journal.set_modes({"shuffle": True, "loop": True})
+    journal.file.close()
+    return journal.journal_path
+
+
+def test_replay(config_path):
+    write_session(config_path)
+
+    journal = SessionJournal(config_path)
+    records = journal.replay()
+
+    assert records == [
+        (QUEUE_ALBUM_TITLE, "/music/a.mp3", 0),
+        (QUEUE_ADD, "/music/a.mp3", 0),
+        (QUEUE_ADD, "/music/b.mp3", 0),
+        (QUEUE_REMOVE, "/music/a.mp3", 0),
+        (MODES, None, encode_modes({"shuffle": True, "loop": True})),
+    ]
+    assert decode_modes(journal.modes)["shuffle"] and not decode_modes(journal.modes)["repeat"]
+
+
+def test_torn_tail_is_cut_off_and_later_records_stay_aligned(config_path):
+    journal_path = write_session(config_path)
+    with open(journal_path, "ab") as f:
+        f.write(RECORD.pack(QUEUE_ADD, 2, 0)[:7])  # a crash in the middle of a record
+
+    journal = SessionJournal(config_path)
+    assert len(journal.replay()) == 5
+    assert os.path.getsize(journal_path) == 5 * RECORD.size
+
+    journal.queue_add("/music/a.mp3")
+    journal.file.close()
+
+    records = SessionJournal(config_path).replay()
+    assert len(records) == 6
+    assert records[-1] == (QUEUE_ADD, "/music/a.mp3", 0)
+
+
+def test_garbage_record_ends_the_replay(config_path):
+    journal_path = write_session(config_path)
+    with open(journal_path, "ab") as f:
+        f.write(RECORD.pack(99, 1, 0) + RECORD.pack(QUEUE_ADD, 1, 0))
+
+    assert len(SessionJournal(config_path).replay()) == 5
+    assert os.path.getsize(journal_path) == 5 * RECORD.size
+
+
+def test_old_track_and_position_records_are_skipped(config_path):
+    journal_path = write_session(config_path)
+    with open(journal_path, "ab") as f:
+        f.write(RECORD.pack(4, 1, 0) + RECORD.pack(5, 1, 61000) + RECORD.pack(QUEUE_ADD, 2, 0))
+
+    records = SessionJournal(config_path).replay()
+    assert len(records) == 6
+    assert records[-1] == (QUEUE_ADD, "/music/b.mp3", 0)
+
+
+def test_compact_keeps_only_the_modes(config_path):
+    write_session(config_path)
+    journal = SessionJournal(config_path)
+    journal.replay()
+    snapshots = []
+    journal.snapshot = lambda: snapshots.append(True)
+
+    journal.compact()
+
+    assert snapshots == [True]
+    assert SessionJournal(config_path).replay() == [(MODES, None, journal.modes)]